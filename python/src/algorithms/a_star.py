@@ -0,0 +1,71 @@
+from typing import Callable, List
+
+import numpy as np
+
+from src.algorithms.dijkstra import SearchResult, path_to
+from src.structures.graph import Graph, GraphM, as_adjacency
+from src.structures.heap import IndexedHeap
+
+EARTH_RADIUS = 6371.0088  # km
+
+Heuristic = Callable[[np.ndarray, int], np.ndarray]
+
+
+def euclidean(coords: np.ndarray, target: int) -> np.ndarray:
+    """ Straight line distance from every (x, y) to target """
+    delta = coords - coords[target]
+    return np.hypot(delta[:, 0], delta[:, 1])
+
+
+def haversine(coords: np.ndarray, target: int, radius: float = EARTH_RADIUS) -> np.ndarray:
+    """ Great-circle distance from every (lat, lon) in degrees to target """
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    sin_lat, sin_lon = np.sin((lat - lat[target]) / 2), np.sin((lon - lon[target]) / 2)
+    chord = sin_lat ** 2 + np.cos(lat) * np.cos(lat[target]) * sin_lon ** 2
+    return 2 * radius * np.arcsin(np.sqrt(np.minimum(chord, 1.)))
+
+
+def a_star(
+        graph: Graph,
+        start: int,
+        end: int,
+        coords: np.ndarray,
+        heuristic: Heuristic = euclidean,
+        scale: float = 1.,
+) -> SearchResult:
+    """ Dijkstra guided by lower bound of distance to end
+    @param coords: (n, 2) coordinates of nodes, (x, y) for euclidean and (lat, lon) for haversine
+    @param heuristic: distance from every node to end, must not overestimate weights divided by scale
+    @param scale: weight of one coordinate unit (for example cost per km)
+    """
+    graph = as_adjacency(graph)
+    length = len(graph)
+    estimate: List[float] = (heuristic(np.asarray(coords, dtype=np.float64), end) * scale).tolist()
+    distance: List[float] = [float('inf')] * length
+    predecessor = np.full(length, -1, dtype=np.int64)
+    heap = IndexedHeap(length)
+    distance[start] = 0
+    heap.push(start, estimate[start])
+    settled = 0
+
+    while not heap.empty():
+        node, _ = heap.pop()
+        settled += 1
+        if node == end:
+            return SearchResult(distance[end], path_to(predecessor, end), settled)
+        price = distance[node]
+        targets, weights = graph.neighbours(node)
+        for dst, weight in zip(targets.tolist(), weights.tolist()):
+            if price + weight < distance[dst]:  # inconsistent heuristic can reopen settled node
+                distance[dst] = price + weight
+                predecessor[dst] = node
+                heap.update(dst, price + weight + estimate[dst])
+    return SearchResult(None, [], settled)
+
+
+def test():
+    points = np.array([[0, 0], [1, 0], [2, 0], [1, 1], [2, 1], [3, 1]], dtype=float)
+    g = GraphM.create_from(list('abcdef'))
+    for first, second in [(0, 1), (1, 2), (0, 3), (3, 4), (2, 4), (4, 5)]:
+        g.set_connect_symmetric(first, second, float(np.hypot(*(points[first] - points[second]))))
+    print(a_star(g, 0, 5, points))
@@ -1,26 +1,127 @@
-from typing import List, Optional
+from collections import deque
+from typing import Dict, List, Optional, Union
 
-from src.structures.graph import GraphL
+import numpy as np
 
+from src.structures.graph import GraphCSR, GraphL
 
-def bellman_ford(graph: GraphL, start: int) -> Optional[List[float]]:
+
+class NegativeCycleError(Exception):
+    """ Graph contains negative weight cycle reachable from start, cycle is list of nodes """
+
+    def __init__(self, cycle: List[int]):
+        super().__init__(f'Graph contains negative weight cycle: {cycle}')
+        self.cycle = cycle
+
+
+def _cycle(predecessor: List[int], node: int) -> List[int]:
+    """ Walk predecessors until we are surely inside cycle, then collect it in edge order """
+    for _ in range(len(predecessor)):
+        node = predecessor[node]
+    cycle, current = [node], predecessor[node]
+    while current != node:
+        cycle.append(current)
+        current = predecessor[current]
+    return cycle[::-1]
+
+
+def _count(counts: Optional[Dict[str, int]], **values: int) -> None:
+    if counts is not None:
+        counts.update(values)
+
+
+def bellman_ford(graph: Union[GraphL, GraphCSR], start: int, counts: Optional[Dict[str, int]] = None) -> List[float]:
+    """ Passes over all edges until nothing relaxes, raises NegativeCycleError after V passes
+    @param counts: if given, gets passes, scanned edges and relaxations
+    """
     length = len(graph)
     distance = [float('inf')] * length
     distance[start] = 0.0
+    predecessor = [-1] * length
+    relaxations = 0
 
-    for i in range(length - 1):
+    for passes in range(1, length + 1):
+        changed = -1
         for u, v, w in graph.edges:
             if distance[u] != float('inf') and distance[u] + w < distance[v]:
                 distance[v] = distance[u] + w
+                predecessor[v] = u
+                changed = v
+                relaxations += 1
+        if changed == -1:
+            _count(counts, passes=passes, scanned=passes * len(graph.columns()[2]), relaxations=relaxations)
+            return distance
+
+    raise NegativeCycleError(_cycle(predecessor, changed))
 
-        for u, v, w in graph.edges:
-            if distance[u] != float("Inf") and distance[u] + w < distance[v]:
-                print('Graph contains negative weight cycle')
-                return None
 
+def spfa(graph: Union[GraphL, GraphCSR], start: int, counts: Optional[Dict[str, int]] = None) -> List[float]:
+    """ Queue-based Bellman-Ford: only edges out of changed nodes are relaxed
+    @param counts: if given, gets pops of queue, scanned edges and relaxations
+    """
+    graph = GraphCSR.from_graph(graph)
+    length = len(graph)
+    distance = [float('inf')] * length
+    distance[start] = 0.0
+    predecessor = [-1] * length
+    edges_in_path = [0] * length
+    queued = [False] * length
+    queue = deque([start])
+    queued[start] = True
+    pops = scanned = relaxations = 0
+
+    while queue:
+        u = queue.popleft()
+        queued[u] = False
+        targets, weights = graph.neighbours(u)
+        pops += 1
+        scanned += len(targets)
+        for v, w in zip(targets.tolist(), weights.tolist()):
+            if distance[u] + w < distance[v]:
+                relaxations += 1
+                distance[v] = distance[u] + w
+                predecessor[v] = u
+                edges_in_path[v] = edges_in_path[u] + 1
+                if edges_in_path[v] >= length:  # simple path can't be that long
+                    raise NegativeCycleError(_cycle(predecessor, v))
+                if not queued[v]:
+                    queued[v] = True
+                    queue.append(v)
+    _count(counts, pops=pops, scanned=scanned, relaxations=relaxations)
     return distance
 
 
+def bellman_ford_vectorized(
+        graph: Union[GraphL, GraphCSR],
+        start: int,
+        counts: Optional[Dict[str, int]] = None,
+) -> np.ndarray:
+    """ Every pass relaxes all edges at once with array operations over edge columns
+    @param counts: if given, gets passes, scanned edges and relaxations (nodes lowered by a pass, summed)
+    """
+    sources, targets, weights = graph.columns()
+    length = len(graph)
+    distance = np.full(length, np.inf)
+    distance[start] = 0.
+    predecessor = np.full(length, -1, dtype=np.int64)
+    relaxations = 0
+
+    for passes in range(1, length + 1):
+        candidate = distance[sources] + weights
+        relaxed = distance.copy()
+        np.minimum.at(relaxed, targets, candidate)
+        improved = relaxed < distance
+        if not improved.any():
+            _count(counts, passes=passes, scanned=passes * len(sources), relaxations=relaxations)
+            return distance
+        relaxations += int(np.count_nonzero(improved))
+        best = improved[targets] & (candidate == relaxed[targets])
+        predecessor[targets[best]] = sources[best]
+        distance = relaxed
+
+    raise NegativeCycleError(_cycle(predecessor.tolist(), int(np.flatnonzero(improved)[0])))
+
+
 def test():
     g = GraphL(5)
     g.add_edge(0, 1, -1)
@@ -32,3 +133,10 @@ def test():
     g.add_edge(3, 1, 1)
     g.add_edge(4, 3, -3)
     print(bellman_ford(g, 0))
+    print(spfa(g, 0))
+    print(bellman_ford_vectorized(g, 0))
+    g.add_edge(3, 4, 2)
+    try:
+        bellman_ford(g, 0)
+    except NegativeCycleError as error:
+        print(error.cycle)
@@ -0,0 +1,53 @@
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.structures.graph import Edge, GraphCSR, GraphL
+
+
+def boruvka(graph: Union[GraphL, GraphCSR], counts: Optional[Dict[str, int]] = None) -> List[Edge]:
+    """ Minimum spanning tree (forest if graph is not connected), edges are treated as undirected
+    every round picks cheapest edge of every component at once, then merges components by pointer jumping
+    @param counts: if given, gets rounds, scanned edges, unions (joined components) and jumps of pointers
+    """
+    sources, targets, weights = graph.columns()
+    sources, targets = sources.astype(np.int64), targets.astype(np.int64)
+    order = np.argsort(weights, kind='stable')
+    position = np.empty(len(order), dtype=np.int64)  # unique rank of edge breaks ties, so no cycles
+    position[order] = np.arange(len(order))
+    component = np.arange(len(graph))
+    selected: List[np.ndarray] = []
+    rounds = scanned = jumps = 0
+
+    while True:
+        first, second = component[sources], component[targets]
+        outer = np.flatnonzero(first != second)
+        if len(outer) == 0:
+            break
+        rounds += 1
+        scanned += len(outer)
+        cheapest = np.full(len(graph), len(order), dtype=np.int64)
+        np.minimum.at(cheapest, first[outer], position[outer])
+        np.minimum.at(cheapest, second[outer], position[outer])
+
+        roots = np.flatnonzero(cheapest < len(order))
+        chosen = order[cheapest[roots]]
+        selected.append(np.unique(chosen))
+
+        parent = np.arange(len(graph))
+        parent[roots] = np.where(first[chosen] == roots, second[chosen], first[chosen])
+        mutual = roots[(parent[parent[roots]] == roots) & (roots < parent[roots])]  # pair picked one edge
+        parent[mutual] = mutual
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+            jumps += 1
+        component = parent[component]
+
+    chosen = np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+    if counts is not None:
+        counts.update(rounds=rounds, scanned=scanned, unions=len(chosen), jumps=jumps)
+    return [Edge(price, src, dst) for price, src, dst in
+            zip(weights[chosen].tolist(), sources[chosen].tolist(), targets[chosen].tolist())]
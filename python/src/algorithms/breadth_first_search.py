@@ -1,15 +1,43 @@
-from python.src.structures.graph import GraphM
+from collections import deque
+from typing import Set
 
+import numpy as np
 
-def breadth_first_search(graph: GraphM, start: int):
-    visited, queue = {start}, [start]
+from src.structures.graph import Graph, GraphCSR, GraphM, as_adjacency
+
+
+def breadth_first_search(graph: Graph, start: int) -> Set[int]:
+    graph = as_adjacency(graph)
+    visited = bytearray(len(graph))
+    visited[start] = 1
+    queue = deque([start])
     while queue:
-        v = queue.pop(0)
-        for index in range(len(graph.adjacency_matrix[v])):
-            if index == v or not graph.adjacency_matrix[v][index] > 0:
-                continue
-
-            if index not in visited:  # иначе есть цикл
-                visited.add(visited)
-                queue.append(visited)
-    return visited
+        v = queue.popleft()
+        for index in graph.neighbours(v)[0].tolist():
+            if not visited[index]:  # иначе есть цикл
+                visited[index] = 1
+                queue.append(index)
+    return set(np.flatnonzero(np.frombuffer(visited, dtype=np.uint8)).tolist())
+
+
+def bfs_levels(graph: Graph, start: int) -> np.ndarray:
+    """ Number of edges from start to every node, -1 if unreachable, one frontier at a time """
+    graph = GraphCSR.from_graph(graph)
+    level = np.full(len(graph), -1, dtype=np.int64)
+    level[start] = 0
+    frontier, depth = np.array([start]), 0
+    while len(frontier):
+        depth += 1
+        found = graph.frontier(frontier)
+        frontier = np.unique(found[level[found] == -1])
+        level[frontier] = depth
+    return level
+
+
+def test():
+    g = GraphM.create_from(['a', 'b', 'c', 'd', 'e', 'f'])
+    g.set_connect_asymmetric(0, 1)
+    g.set_connect_asymmetric(1, 2)
+    g.set_connect_symmetric(2, 3)
+    g.set_connect_asymmetric(4, 5)
+    print(breadth_first_search(g, 0), bfs_levels(g, 0))
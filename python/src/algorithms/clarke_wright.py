@@ -0,0 +1,121 @@
+from heapq import heapify, heappop, heapreplace
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.boxer.generator import small_track
+from src.boxer.models import Track
+from src.structures.disjoint_set import DisjointSet
+from src.structures.matrix import Matrix
+
+CHUNK_SIZE = 32
+
+
+def savings_pairs(
+        weight_matrix: Matrix,
+        depot: int,
+        active: Optional[np.ndarray] = None,
+        chunk: int = CHUNK_SIZE,
+) -> Iterator[Tuple[float, int, int]]:
+    """ Positive savings (s, i, j), i < j, in descending order, memory O(n * chunk) instead of n^2
+    every row keeps next chunk of its best pairs, rows are merged by heap and refilled from matrix rows on demand
+    @param active: nodes, caller may clear them while iterating, pairs with cleared nodes are skipped
+    """
+    length = len(weight_matrix)
+    from_depot = np.asarray(weight_matrix[depot], dtype=np.float64)
+    active = np.ones(length, dtype=bool) if active is None else active
+
+    def refill(row: int, last_saving: float, last_col: int) -> List[Tuple[float, int]]:
+        cols = np.arange(row + 1, length)
+        savings = from_depot[row] + from_depot[row + 1:] - np.asarray(weight_matrix[row][row + 1:], dtype=np.float64)
+        left = (savings > 0) & (cols != depot) & active[row + 1:]
+        left &= (savings < last_saving) | (savings == last_saving) & (cols > last_col)
+        savings, cols = savings[left], cols[left]
+        if len(savings) > chunk:
+            threshold = np.partition(savings, len(savings) - chunk)[len(savings) - chunk]
+            savings, cols = savings[savings >= threshold], cols[savings >= threshold]
+        order = np.lexsort((cols, -savings))[:chunk]
+        return list(zip(savings[order].tolist(), cols[order].tolist()))
+
+    chunks = {}
+    heap = []
+    for row in range(length):
+        if row == depot:
+            continue
+        chunks[row] = refill(row, np.inf, -1)
+        if chunks[row]:
+            saving, col = chunks[row].pop(0)
+            heap.append((-saving, row, col))
+    heapify(heap)
+
+    while heap:
+        saving, row, col = heap[0]
+        if not active[row]:
+            heappop(heap)
+            continue
+        if active[col]:
+            yield -saving, row, col
+        while chunks[row] and not active[chunks[row][0][1]]:
+            chunks[row].pop(0)
+        if not chunks[row]:
+            chunks[row] = refill(row, -saving, col)
+        if chunks[row]:
+            next_saving, next_col = chunks[row].pop(0)
+            heapreplace(heap, (-next_saving, row, next_col))
+        else:
+            heappop(heap)
+
+
+def clarke_wright(
+        weight_matrix: Matrix,
+        weights: Sequence[float],
+        values: Sequence[float],
+        track: Track,
+        depot: int = 0,
+) -> List[List[int]]:
+    """ Parallel savings algorithm, routes start and end in depot
+    @param weights: weight of order in every node (kg), depot is ignored
+    @param values: value of order in every node (m3), depot is ignored
+    @param track: lifting_capacity and value_capacity limit every route
+    @return: nodes of every route without depot
+    """
+    length = len(weight_matrix)
+    routes = DisjointSet(length)
+    load_weight, load_value = list(weights), list(values)
+    links: List[List[int]] = [[] for _ in range(length)]
+    ends = np.ones(length, dtype=bool)  # node is an end of its route
+
+    for _, first, second in savings_pairs(weight_matrix, depot, ends):
+        first_route, second_route = routes.find(first), routes.find(second)
+        if first_route == second_route:
+            continue
+        weight = load_weight[first_route] + load_weight[second_route]
+        value = load_value[first_route] + load_value[second_route]
+        if weight > track.lifting_capacity or value > track.value_capacity:
+            continue
+        routes.union(first, second)
+        root = routes.find(first)
+        load_weight[root], load_value[root] = weight, value
+        links[first].append(second)
+        links[second].append(first)
+        ends[first], ends[second] = len(links[first]) < 2, len(links[second]) < 2
+
+    result, seen = [], [False] * length
+    for start in range(length):
+        if start == depot or seen[start] or len(links[start]) == 2:
+            continue
+        route, prev, node = [], -1, start
+        while node != -1:
+            seen[node] = True
+            route.append(node)
+            following = [other for other in links[node] if other != prev]
+            prev, node = node, following[0] if following else -1
+        result.append(route)
+    return result
+
+
+def test():
+    points = np.random.rand(200, 2) * 10
+    weights, values = np.random.randint(50, 300, 200).tolist(), (np.random.rand(200) * 2).tolist()
+    routes = clarke_wright(Matrix.weight_matrix(points), weights, values, small_track())
+    print(len(routes), [sum(weights[node] for node in route) for route in routes])
@@ -0,0 +1,41 @@
+from typing import Tuple
+
+import numpy as np
+
+from src.algorithms.breadth_first_search import bfs_levels
+from src.structures.graph import Graph, GraphCSR
+
+
+def reachable(graph: Graph, start: int) -> np.ndarray:
+    """ Mask of nodes reachable from start along edge directions """
+    return bfs_levels(graph, start) >= 0
+
+
+def connected_components(graph: Graph) -> Tuple[int, np.ndarray]:
+    """ Number of components and component label of every node, edge directions are ignored
+    every round hooks both ends of every edge to the smaller root at once, then pointers jump to roots,
+    labels are numbered by the smallest node of component
+    """
+    sources, targets, _ = GraphCSR.from_graph(graph).columns()
+    parent = np.arange(len(graph))
+    while True:
+        first, second = parent[sources], parent[targets]
+        lower = np.minimum(first, second)
+        hooked = parent.copy()
+        np.minimum.at(hooked, first, lower)
+        np.minimum.at(hooked, second, lower)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, parent):
+            break
+        parent = hooked
+    roots, labels = np.unique(parent, return_inverse=True)
+    return len(roots), labels.astype(np.int64)
+
+
+def is_connected(graph: Graph) -> bool:
+    """ One component, edge directions are ignored: one search from node 0 visits every node """
+    return len(graph) == 0 or bool(reachable(GraphCSR.from_graph(graph).undirected(), 0).all())
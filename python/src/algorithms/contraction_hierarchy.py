@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from heapq import heappop, heappush
+from random import Random
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.algorithms.dijkstra import dijkstra
+from src.structures.graph import Graph, GraphCSR, GraphL
+from src.structures.heap import IndexedHeap
+from src.structures.storage import load_arrays, save_arrays
+
+WITNESS_SETTLED = 64  # witness search gives up after this many nodes and adds shortcut
+
+
+def _witness(out: List[Dict[int, float]], source: int, skip: int, limit: float) -> Dict[int, float]:
+    """ Distances from source not going through skip, not longer than limit """
+    distance = {source: 0.}
+    heap = [(0., source)]
+    settled = 0
+    while heap and settled < WITNESS_SETTLED:
+        price, node = heappop(heap)
+        if price > distance[node]:
+            continue
+        if price > limit:
+            break
+        settled += 1
+        for dst, weight in out[node].items():
+            if dst != skip and price + weight < distance.get(dst, float('inf')):
+                distance[dst] = price + weight
+                heappush(heap, (price + weight, dst))
+    return distance
+
+
+def _shortcuts(out: List[Dict[int, float]], inc: List[Dict[int, float]], node: int) -> List[Tuple[int, int, float]]:
+    """ Edges to add so distances between neighbours survive removing node """
+    shortcuts = []
+    for src, first in inc[node].items():
+        limit = first + max((weight for dst, weight in out[node].items() if dst != src), default=0.)
+        witness = _witness(out, src, node, limit)
+        for dst, second in out[node].items():
+            if dst != src and witness.get(dst, float('inf')) > first + second:
+                shortcuts.append((src, dst, first + second))
+    return shortcuts
+
+
+@dataclass
+class ContractionHierarchy:
+    """ Nodes ordered by rank, up: edges to higher rank, down: reversed edges coming from higher rank """
+    rank: np.ndarray
+    up: GraphCSR
+    down: GraphCSR
+
+    def __len__(self) -> int:
+        return len(self.rank)
+
+    @staticmethod
+    def build(graph: Graph) -> ContractionHierarchy:
+        """ Contract nodes by edge difference (lazy updates), witness searches are limited by WITNESS_SETTLED """
+        csr = GraphCSR.from_graph(graph)
+        length = len(csr)
+        out: List[Dict[int, float]] = [{} for _ in range(length)]
+        inc: List[Dict[int, float]] = [{} for _ in range(length)]
+        for src, dst, weight in csr.edges:
+            if src != dst and weight < out[src].get(dst, float('inf')):
+                out[src][dst] = inc[dst][src] = weight
+
+        contracted_neighbours = [0] * length
+
+        def priority(node: int) -> int:
+            return len(_shortcuts(out, inc, node)) - len(out[node]) - len(inc[node]) + contracted_neighbours[node]
+
+        queue = [(priority(node), node) for node in range(length)]
+        queue.sort()
+        rank = np.zeros(length, dtype=np.int64)
+        up, down = GraphL(length), GraphL(length)
+        level = 0
+        while queue:
+            _, node = heappop(queue)
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heappush(queue, (current, node))
+                continue
+
+            for src, dst, weight in _shortcuts(out, inc, node):
+                if weight < out[src].get(dst, float('inf')):
+                    out[src][dst] = inc[dst][src] = weight
+            for dst, weight in out[node].items():
+                up.add_edge(node, dst, weight)
+                del inc[dst][node]
+                contracted_neighbours[dst] += 1
+            for src, weight in inc[node].items():
+                down.add_edge(node, src, weight)
+                del out[src][node]
+                contracted_neighbours[src] += 1
+            out[node], inc[node] = {}, {}
+            rank[node] = level
+            level += 1
+
+        return ContractionHierarchy(rank, GraphCSR.from_graph(up), GraphCSR.from_graph(down))
+
+    def query(self, start: int, end: int) -> Optional[float]:
+        """ Bidirectional search, both sides only go up in rank """
+        length = len(self)
+        distance = ([float('inf')] * length, [float('inf')] * length)
+        heaps = (IndexedHeap(length), IndexedHeap(length))
+        graphs = (self.up, self.down)
+        distance[0][start] = distance[1][end] = 0
+        heaps[0].push(start, 0)
+        heaps[1].push(end, 0)
+        best = float('inf')
+        active = [True, True]
+
+        while active[0] or active[1]:
+            for side in (0, 1):
+                if not active[side]:
+                    continue
+                if heaps[side].empty():
+                    active[side] = False
+                    continue
+                node, price = heaps[side].pop()
+                if price >= best:  # nothing better can be found on this side
+                    active[side] = False
+                    continue
+                best = min(best, price + distance[1 - side][node])
+                targets, weights = graphs[side].neighbours(node)
+                for dst, weight in zip(targets.tolist(), weights.tolist()):
+                    if price + weight < distance[side][dst]:
+                        distance[side][dst] = price + weight
+                        heaps[side].update(dst, price + weight)
+        return None if best == float('inf') else best
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> ContractionHierarchy:
+        """ Load hierarchy written by save, arrays are memory-mapped read-only by default """
+        arrays, _ = load_arrays(path, 'contraction_hierarchy', mmap)
+        length = len(arrays['rank'])
+        return ContractionHierarchy(
+            arrays['rank'],
+            GraphCSR(length, arrays['up_offsets'], arrays['up_targets'], arrays['up_weights']),
+            GraphCSR(length, arrays['down_offsets'], arrays['down_targets'], arrays['down_weights']),
+        )
+
+    def save(self, path: str) -> None:
+        save_arrays(path, 'contraction_hierarchy', {
+            'rank': self.rank,
+            'up_offsets': self.up.offsets, 'up_targets': self.up.targets, 'up_weights': self.up.weights,
+            'down_offsets': self.down.offsets, 'down_targets': self.down.targets, 'down_weights': self.down.weights,
+        })
+
+
+def benchmark(nodes: int = 2000, degree: int = 3, queries: int = 200, seed: int = 0) -> None:
+    """ Query latency of contraction hierarchy against plain dijkstra on random geometric graph """
+    random = Random(seed)
+    points = np.array([(random.random(), random.random()) for _ in range(nodes)])
+    graph = GraphL(nodes)
+    for idx in range(nodes):
+        distances = np.hypot(*(points - points[idx]).T)
+        for idy in np.argsort(distances)[1:degree + 1].tolist():
+            graph.add_edge(idx, idy, float(distances[idy]))
+            graph.add_edge(idy, idx, float(distances[idy]))
+    csr = GraphCSR.from_graph(graph)
+    pairs = [(random.randrange(nodes), random.randrange(nodes)) for _ in range(queries)]
+
+    start = perf_counter()
+    hierarchy = ContractionHierarchy.build(csr)
+    print(f'build: {perf_counter() - start:.2f}s, '
+          f'edges: {len(csr.targets)}, hierarchy edges: {len(hierarchy.up.targets) + len(hierarchy.down.targets)}')
+
+    start = perf_counter()
+    expected = [dijkstra(csr, first, second, queue='heap') for first, second in pairs]
+    plain = (perf_counter() - start) / queries
+    start = perf_counter()
+    found = [hierarchy.query(first, second) for first, second in pairs]
+    contracted = (perf_counter() - start) / queries
+
+    mismatches = sum(1 for a, b in zip(expected, found) if (a is None) != (b is None) or a and abs(a - b) > 1e-9)
+    print(f'dijkstra: {plain * 1000:.3f}ms/query, hierarchy: {contracted * 1000:.3f}ms/query, '
+          f'speedup: {plain / contracted:.1f}x, mismatches: {mismatches}')
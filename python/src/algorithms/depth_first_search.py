@@ -1,15 +1,19 @@
-from src.structures.graph import GraphM
+from typing import Set
 
+import numpy as np
 
-def depth_first_search(graph: GraphM, start: int):
-    visited, stack = {start}, [start]
+from src.structures.graph import Graph, as_adjacency
+
+
+def depth_first_search(graph: Graph, start: int) -> Set[int]:
+    graph = as_adjacency(graph)
+    visited = bytearray(len(graph))
+    visited[start] = 1
+    stack = [start]
     while stack:
         v = stack.pop()
-        for index in range(len(graph.adjacency_matrix[v])):
-            if index == v or not graph.adjacency_matrix[v][index] > 0:
-                continue
-
-            if index not in visited:
-                visited.add(index)
+        for index in graph.neighbours(v)[0].tolist():
+            if not visited[index]:
+                visited[index] = 1
                 stack.append(index)
-    return visited
+    return set(np.flatnonzero(np.frombuffer(visited, dtype=np.uint8)).tolist())
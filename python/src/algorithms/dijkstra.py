@@ -1,33 +1,183 @@
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from src.structures.graph import GraphM
-from src.structures.heap import Heap
+import numpy as np
 
+from src.structures.bucket import Queue, queue_factory
+from src.structures.graph import Graph, GraphCSR, GraphM, as_adjacency
+from src.structures.heap import IndexedHeap
 
-@dataclass(order=True)
-class Edge:
-    price: float
-    dst: int
+_worker: Optional[Tuple[Union[GraphM, GraphCSR], Callable[[int], Queue], np.ndarray]] = None
 
 
-def dijkstra(graph: GraphM, start: int, end: int) -> Optional[float]:
-    """ Finding minimum path from "start" node to "end" node """
-    heap = Heap()
-    heap.push(Edge(0, start))
-    visited: List[bool] = [False] * len(graph)
+def edge_weights(graph: Graph) -> np.ndarray:
+    """ All weights of graph, zeros of adjacency matrix included """
+    if isinstance(graph, GraphCSR):
+        return graph.weights
+    return graph.adjacency_matrix.matrix
+
+
+def weight_bounds(graph: Graph) -> Optional[Tuple[bool, int]]:
+    """ Integrality and upper bound of weights kept by GraphM, None when weights have to be inspected """
+    return graph.weight_bounds() if isinstance(graph, GraphM) else None
+
+
+def _search(
+        graph: Union[GraphM, GraphCSR],
+        make: Callable[[int], Queue],
+        source: int,
+        targets: Optional[Iterable[int]],
+        counts: Optional[Dict[str, int]] = None,
+) -> Tuple[List[float], List[int]]:
+    """ Dijkstra from source, stops when all targets are settled
+    @param counts: if given, gets pops of queue and relaxations (lowered distances)
+    """
+    length = len(graph)
+    heap = make(length)
+    heap.push(source, 0)
+    distance: List[float] = [float('inf')] * length
+    distance[source] = 0
+    predecessor: List[int] = [-1] * length
+    visited: List[bool] = [False] * length
+    left = None if targets is None else set(targets)
+    pops = relaxations = 0
     while not heap.empty():
-        min_edge: Edge = heap.pop()
-        if visited[min_edge.dst]:
-            continue
-        visited[min_edge.dst] = True
-        if min_edge.dst == end:
-            return min_edge.price
-        for edge in graph.connections_from(min_edge.dst):
-            if visited[edge[0].index]:
+        node, price = heap.pop()
+        pops += 1
+        visited[node] = True
+        if left is not None:
+            left.discard(node)
+            if not left:
+                break
+        nodes, weights = graph.neighbours(node)
+        for dst, weight in zip(nodes.tolist(), weights.tolist()):
+            if visited[dst] or price + weight >= distance[dst]:
                 continue
-            heap.push(Edge(min_edge.price + edge[1], edge[0].index))
-    return None
+            distance[dst] = price + weight
+            predecessor[dst] = node
+            heap.update(dst, distance[dst])
+            relaxations += 1
+    if counts is not None:
+        counts.update(pops=pops, relaxations=relaxations)
+    return distance, predecessor
+
+
+def shortest_paths(
+        graph: Graph,
+        source: int,
+        targets: Optional[Iterable[int]] = None,
+        queue: str = 'auto',
+        counts: Optional[Dict[str, int]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Distances (inf if unreachable) and predecessors (-1 for none) from source to every node
+    @param targets: stop as soon as these nodes are settled, other distances are then upper bounds
+    @param queue: heap, dial, radix or auto, see queue_factory
+    @param counts: if given, gets pops of queue and relaxations
+    """
+    graph = as_adjacency(graph)
+    make = queue_factory(queue, edge_weights(graph), known=weight_bounds(graph))
+    distance, predecessor = _search(graph, make, source, targets, counts)
+    return np.array(distance, dtype=np.float64), np.array(predecessor, dtype=np.int64)
+
+
+def path_to(predecessor: np.ndarray, target: int) -> List[int]:
+    """ Nodes from source to target by predecessors of shortest_paths, check distance for unreachable target """
+    path = [target]
+    while predecessor[path[-1]] != -1:
+        path.append(int(predecessor[path[-1]]))
+    return path[::-1]
+
+
+def dijkstra(graph: Graph, start: int, end: int, queue: str = 'auto') -> Optional[float]:
+    """ Finding minimum path from "start" node to "end" node
+    @param queue: heap, dial, radix or auto, see queue_factory
+    """
+    distance, _ = shortest_paths(graph, start, [end], queue)
+    return None if distance[end] == float('inf') else distance[end]
+
+
+@dataclass
+class SearchResult:
+    """ Point-to-point search: distance (None if unreachable), nodes of path and number of settled nodes """
+    distance: Optional[float]
+    path: List[int] = field(default_factory=list)
+    settled: int = 0
+
+
+def bidirectional_dijkstra(graph: Graph, start: int, end: int) -> SearchResult:
+    """ Dijkstra from start over outgoing edges and from end over incoming edges until frontiers meet """
+    if start == end:
+        return SearchResult(0, [start], 0)
+    graph = as_adjacency(graph)
+    length = len(graph)
+    distance = ([float('inf')] * length, [float('inf')] * length)
+    predecessor = ([-1] * length, [-1] * length)
+    visited = ([False] * length, [False] * length)
+    heaps = (IndexedHeap(length), IndexedHeap(length))
+    expand = (graph.neighbours, graph.incoming)
+    distance[0][start] = distance[1][end] = 0
+    heaps[0].push(start, 0)
+    heaps[1].push(end, 0)
+    best, meeting, settled = float('inf'), -1, 0
+
+    while not heaps[0].empty() and not heaps[1].empty():
+        if heaps[0].min()[1] + heaps[1].min()[1] >= best:
+            break
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        node, price = heaps[side].pop()
+        visited[side][node] = True
+        settled += 1
+        nodes, weights = expand[side](node)
+        for dst, weight in zip(nodes.tolist(), weights.tolist()):
+            if price + weight < distance[side][dst] and not visited[side][dst]:
+                distance[side][dst] = price + weight
+                predecessor[side][dst] = node
+                heaps[side].update(dst, price + weight)
+            if price + weight + distance[1 - side][dst] < best:
+                best, meeting = price + weight + distance[1 - side][dst], dst
+
+    if meeting == -1:
+        return SearchResult(None, [], settled)
+    path = path_to(np.array(predecessor[0]), meeting)
+    node = meeting
+    while predecessor[1][node] != -1:
+        node = predecessor[1][node]
+        path.append(node)
+    return SearchResult(best, path, settled)
+
+
+def _init_worker(graph: Union[GraphM, GraphCSR], make: Callable[[int], Queue], targets: np.ndarray) -> None:
+    global _worker
+    _worker = graph, make, targets
+
+
+def _table_row(source: int) -> np.ndarray:
+    graph, make, targets = _worker
+    distance, _ = _search(graph, make, source, targets.tolist())
+    return np.array(distance, dtype=np.float64)[targets]
+
+
+def distance_table(
+        graph: Graph,
+        sources: Sequence[int],
+        targets: Sequence[int],
+        processes: Optional[int] = None,
+        queue: str = 'auto',
+) -> np.ndarray:
+    """ len(sources) x len(targets) matrix of distances, one early-exit search per source
+    @param processes: worker processes, None for cpu count, 1 to stay in this process;
+                      workers get the graph once at start (shared copy-on-write where processes fork)
+    """
+    graph = as_adjacency(graph)
+    make = queue_factory(queue, edge_weights(graph), known=weight_bounds(graph))
+    targets = np.asarray(targets, dtype=np.int64)
+    if processes == 1 or len(sources) < 2:
+        rows = [np.array(_search(graph, make, source, targets.tolist())[0])[targets] for source in sources]
+    else:
+        with Pool(processes, initializer=_init_worker, initargs=(graph, make, targets)) as pool:
+            rows = pool.map(_table_row, sources, chunksize=max(1, len(sources) // (4 * (processes or 4))))
+    return np.vstack(rows) if rows else np.empty((0, len(targets)))
 
 
 def test():
@@ -41,3 +191,12 @@ def test():
     g.set_connect_symmetric(2, 5, 10)
     g.set_connect_symmetric(3, 4, 3)
     print(dijkstra(g, 0, 5))
+    distance, predecessor = shortest_paths(g, 0)
+    print(distance, path_to(predecessor, 5))
+    print(distance_table(g, [0, 1, 2], [3, 4, 5], processes=2))
+    print(bidirectional_dijkstra(g, 0, 5))
+
+    assert g.weight_bounds() == (True, 10)  # auto takes dial for GraphM without scanning its matrix
+    assert np.array_equal(shortest_paths(g, 0, queue='auto')[0], distance)
+    infinite = GraphCSR.from_edges(2, [0], [1], [np.inf])  # inf is not integral, auto falls back to heap
+    assert np.array_equal(shortest_paths(infinite, 0)[0], [0., np.inf])
@@ -0,0 +1,113 @@
+from typing import List, Optional, Set
+
+import numpy as np
+
+from src.algorithms.dijkstra import path_to, shortest_paths
+from src.structures.graph import GraphM
+from src.structures.heap import IndexedHeap
+
+
+class ShortestPathTree:
+    """ Shortest paths from source kept up to date while weights of graph change
+    only nodes whose distance can change are searched again: below the changed edge for decrease,
+    subtree of the changed edge for increase; weight 0 means no edge as everywhere in GraphM
+    """
+
+    def __init__(self, graph: GraphM, source: int, subscribe: bool = True):
+        self.graph = graph
+        self.source = source
+        self.distance, self.parent = shortest_paths(graph, source, queue='heap')
+        self.children: List[Set[int]] = [set() for _ in range(len(graph))]
+        for node, parent in enumerate(self.parent.tolist()):
+            if parent != -1:
+                self.children[parent].add(node)
+        self.subscribed = subscribe
+        if subscribe:
+            graph.subscribe(self.update)
+
+    def close(self) -> None:
+        """ Stop following changes of graph """
+        if self.subscribed:
+            self.graph.unsubscribe(self.update)
+            self.subscribed = False
+
+    def distance_to(self, target: int) -> Optional[float]:
+        distance = float(self.distance[target])
+        return None if distance == float('inf') else distance
+
+    def path_to(self, target: int) -> Optional[List[int]]:
+        return None if self.distance_to(target) is None else path_to(self.parent, target)
+
+    def _attach(self, node: int, parent: int) -> None:
+        if self.parent[node] != -1:
+            self.children[self.parent[node]].discard(node)
+        self.parent[node] = parent
+        if parent != -1:
+            self.children[parent].add(node)
+
+    def _propagate(self, heap: IndexedHeap, changed: Set[int]) -> None:
+        """ Dijkstra from nodes of heap over current distances, improved nodes are re-attached """
+        while not heap.empty():
+            node, price = heap.pop()
+            changed.add(node)
+            targets, weights = self.graph.neighbours(node)
+            for dst, weight in zip(targets.tolist(), weights.tolist()):
+                if price + weight < self.distance[dst]:
+                    self.distance[dst] = price + weight
+                    self._attach(dst, node)
+                    heap.update(dst, price + weight)
+
+    def update(self, first: int, second: int, old: float, new: float) -> Set[int]:
+        """ Repair tree after weight of edge first -> second changed from old to new
+        @return: nodes whose distance or path changed
+        """
+        new = float('inf') if new == 0 else new
+        heap = IndexedHeap(len(self.graph))
+        changed: Set[int] = set()
+        if self.parent[second] == first and new > old:
+            changed.update(self._detach(second, heap))
+        elif self.distance[first] + new < self.distance[second]:
+            self.distance[second] = self.distance[first] + new
+            self._attach(second, first)
+            heap.push(second, self.distance[second])
+        self._propagate(heap, changed)
+        return changed
+
+    def _detach(self, root: int, heap: IndexedHeap) -> List[int]:
+        """ Cut subtree of root, push its nodes reachable by edges from outside to heap, return the subtree """
+        subtree, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            subtree.append(node)
+            stack.extend(self.children[node])
+        inside = np.zeros(len(self.graph), dtype=bool)
+        inside[subtree] = True
+        self.distance[inside] = np.inf
+        for node in subtree:
+            self._attach(node, -1)
+
+        for node in subtree:
+            sources, weights = self.graph.incoming(node)
+            outside = ~inside[sources]
+            sources, prices = sources[outside], self.distance[sources[outside]] + weights[outside]
+            if len(prices) and np.isfinite(prices.min()):
+                best = int(np.argmin(prices))
+                self.distance[node] = prices[best]
+                self._attach(node, int(sources[best]))
+                heap.push(node, self.distance[node])
+        return subtree
+
+
+def test():
+    random = np.random.default_rng(0)
+    graph = GraphM.create_from(list(range(60)))
+    pairs = random.integers(0, 60, (2, 300))
+    graph.connect_many(pairs[0], pairs[1], random.integers(1, 20, 300).astype(np.float64))
+    tree = ShortestPathTree(graph, 0)
+    for _ in range(500):
+        first, second = random.integers(0, 60, 2).tolist()
+        graph.set_connect_asymmetric(first, second, float(random.integers(0, 20)))
+        expected, _ = shortest_paths(graph, 0)
+        assert np.array_equal(expected, tree.distance), (first, second)
+    tree.close()
+    print(tree.distance_to(59), tree.path_to(59))
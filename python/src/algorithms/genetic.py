@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from multiprocessing.pool import Pool
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from src.structures.matrix import Matrix
+
+Fitness = Callable[[np.ndarray], np.ndarray]  # (size, length) population -> (size,) scores, higher is better
+_fitness: Optional[Fitness] = None  # installed once in every worker of pool
+
+
+def gene_type(genes: int) -> type:
+    return np.uint8 if genes <= 256 else np.uint16
+
+
+def _init_worker(fitness: Fitness) -> None:
+    global _fitness
+    _fitness = fitness
+
+
+def _evaluate_chunk(chunk: np.ndarray) -> np.ndarray:
+    return _fitness(chunk)
+
+
+@dataclass
+class TourFitness:
+    """ Negative length of closed tours, rows of population are permutations of nodes """
+    weight_matrix: Matrix
+
+    def __call__(self, population: np.ndarray) -> np.ndarray:
+        population = population.astype(np.int64)
+        return -self.weight_matrix.matrix[population, np.roll(population, -1, axis=1)].sum(axis=1)
+
+
+@dataclass
+class Genetic:
+    """ Genetic algorithm over (size, length) array of genes
+    @param genes: alphabet size, genes are 0..genes-1; for permutation length must be equal to genes
+    @param permutation: rows are permutations, order crossover and swap mutation are used
+    @param elite: part of population copied to next generation as is
+    @param mutation: probability to mutate every gene (swap for permutations)
+    @param tournament: participants of tournament selection
+    @param processes: fitness is evaluated by chunks in process pool, 1 to stay in this process;
+                      workers get the fitness (with its matrix) once at start, only chunks are sent
+    """
+    fitness: Fitness
+    genes: int
+    length: int
+    permutation: bool = False
+    elite: float = 0.1
+    mutation: float = 0.01
+    tournament: int = 3
+    processes: Optional[int] = 1
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.random = np.random.default_rng(self.seed)
+
+    def populate(self, size: int) -> np.ndarray:
+        if self.permutation:
+            return np.argsort(self.random.random((size, self.length)), axis=1).astype(gene_type(self.genes))
+        return self.random.integers(0, self.genes, (size, self.length), dtype=gene_type(self.genes))
+
+    def evaluate(self, population: np.ndarray, pool: Optional[Pool] = None) -> np.ndarray:
+        if pool is None:
+            return np.asarray(self.fitness(population), dtype=np.float64)
+        chunks = np.array_split(population, 4 * (self.processes or 4))
+        return np.concatenate(pool.map(_evaluate_chunk, [chunk for chunk in chunks if len(chunk)])).astype(np.float64)
+
+    def select(self, scores: np.ndarray, count: int) -> np.ndarray:
+        """ Indexes of tournament winners """
+        participants = self.random.integers(0, len(scores), (count, self.tournament))
+        return participants[np.arange(count), np.argmax(scores[participants], axis=1)]
+
+    def crossover(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        if not self.permutation:  # uniform
+            return np.where(self.random.random(first.shape) < 0.5, first, second)
+
+        # order crossover: slice from first, rest in order of second; every row has as many free places
+        # as genes of second not taken, so row-major masks put them in place for all rows at once
+        bounds = np.sort(self.random.integers(0, self.length + 1, (len(first), 2)), axis=1)
+        places = np.arange(self.length)
+        inside = (bounds[:, :1] <= places) & (places < bounds[:, 1:])
+        rows = np.arange(len(first))[:, None]
+        taken = np.zeros((len(first), self.genes), dtype=bool)
+        taken[np.broadcast_to(rows, inside.shape)[inside], first[inside]] = True
+        children = first.copy()
+        children[~inside] = second[~taken[rows, second]]
+        return children
+
+    def mutate(self, population: np.ndarray) -> np.ndarray:
+        if not self.permutation:
+            mask = self.random.random(population.shape) < self.mutation
+            population[mask] = self.random.integers(0, self.genes, np.count_nonzero(mask))
+            return population
+
+        rows = np.flatnonzero(self.random.random(len(population)) < self.mutation * self.length)
+        first = self.random.integers(0, self.length, len(rows))
+        second = self.random.integers(0, self.length, len(rows))
+        population[rows, first], population[rows, second] = population[rows, second], population[rows, first]
+        return population
+
+    def step(self, population: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """ Next generation: elite as is, others are mutated children of tournament winners """
+        size = len(population)
+        elite = np.argsort(-scores, kind='stable')[:int(size * self.elite)]
+        count = size - len(elite)
+        children = self.crossover(population[self.select(scores, count)], population[self.select(scores, count)])
+        return np.concatenate([population[elite], self.mutate(children)])
+
+    def run(self, iterations: int, size: int, population: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Population sorted from best and its scores after iterations generations """
+        population = self.populate(size) if population is None else population
+        pool = None
+        if self.processes != 1:
+            pool = Pool(self.processes, initializer=_init_worker, initargs=(self.fitness, ))
+        try:
+            scores = self.evaluate(population, pool)
+            for _ in range(iterations):
+                population = self.step(population, scores)
+                scores = self.evaluate(population, pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        order = np.argsort(-scores, kind='stable')
+        return population[order], scores[order]
@@ -0,0 +1,42 @@
+from typing import Optional, Union
+
+import numpy as np
+
+from src.algorithms.bellman_ford import bellman_ford_vectorized
+from src.algorithms.dijkstra import distance_table
+from src.structures.graph import GraphCSR, GraphL
+from src.structures.matrix import Matrix
+
+
+def johnson(graph: Union[GraphL, GraphCSR], processes: Optional[int] = None) -> Matrix:
+    """ All pairs shortest paths with negative weights, inf for unreachable pairs
+    potentials come from one Bellman-Ford from virtual source connected to every node by 0 edges,
+    then Dijkstra runs from every node over non-negative reweighted edges in worker processes
+    @raise NegativeCycleError: graph contains negative cycle
+    """
+    length = len(graph)
+    sources, targets, weights = graph.columns()
+
+    extended = GraphL(length + 1)
+    extended.add_edges(sources, targets, weights)
+    extended.add_edges(np.full(length, length), np.arange(length), np.zeros(length))
+    potential = bellman_ford_vectorized(extended, length)[:length]
+
+    reweighted = np.maximum(weights + potential[sources] - potential[targets], 0.)  # rounding can go below 0
+    table = distance_table(GraphCSR.from_edges(length, sources, targets, reweighted),
+                           range(length), range(length), processes)
+    table += potential[np.newaxis, :] - potential[:, np.newaxis]
+    return Matrix.from_array(table)
+
+
+def test():
+    g = GraphL(5)
+    g.add_edge(0, 1, -1)
+    g.add_edge(0, 2, 4)
+    g.add_edge(1, 2, 3)
+    g.add_edge(1, 3, 2)
+    g.add_edge(1, 4, 2)
+    g.add_edge(3, 2, 5)
+    g.add_edge(3, 1, 1)
+    g.add_edge(4, 3, -3)
+    print(johnson(g, processes=2))
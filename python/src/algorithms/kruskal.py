@@ -0,0 +1,26 @@
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.structures.disjoint_set import DisjointSet
+from src.structures.graph import Edge, GraphCSR, GraphL
+
+
+def kruskal(graph: Union[GraphL, GraphCSR], counts: Optional[Dict[str, int]] = None) -> List[Edge]:
+    """ Minimum spanning tree (forest if graph is not connected), edges are treated as undirected
+    @param counts: if given, gets scanned edges and unions (joined components)
+    """
+    sources, targets, weights = graph.columns()
+    components = DisjointSet(len(graph))
+    edges: List[Edge] = []
+    scanned = 0
+    for idx in np.argsort(weights, kind='stable').tolist():
+        if len(edges) == len(graph) - 1:
+            break
+        scanned += 1
+        src, dst = int(sources[idx]), int(targets[idx])
+        if components.union(src, dst):
+            edges.append(Edge(float(weights[idx]), src, dst))
+    if counts is not None:
+        counts.update(scanned=scanned, unions=len(edges))
+    return edges
@@ -1,33 +1,83 @@
-from typing import List
+from typing import Dict, List, Optional, Union
 
-from src.structures.graph import Edge
-from src.structures.heap import Heap
+import numpy as np
+
+from src.structures.bucket import Queue, make_queue
+from src.structures.graph import Edge, GraphM
 from src.structures.matrix import Matrix
 
 
-def prim(weight_matrix: Matrix) -> List[Edge]:
-    """ Finding minimum spanning tree """
+def is_full(weight_matrix: Matrix) -> bool:
+    """ Every pair of different nodes is connected """
+    matrix = weight_matrix.matrix
+    return np.count_nonzero(matrix) - np.count_nonzero(np.diagonal(matrix)) == len(matrix) * (len(matrix) - 1)
+
+
+def _prim_dense(weight_matrix: Matrix, counts: Optional[Dict[str, int]] = None) -> List[Edge]:
+    """ O(V^2) prim: one vector of distances to tree, updated by whole row of new node """
+    length = len(weight_matrix)
+    edges: List[Edge] = [Edge(0, 0, 0)] * (length - 1)
+    distance = np.array(weight_matrix[0], dtype=np.float64)
+    parent = np.zeros(length, dtype=np.int64)
+    visited = np.zeros(length, dtype=bool)
+    visited[0], distance[0] = True, np.inf
+    updates = 0
+    for k in range(length - 1):
+        dst = int(np.argmin(distance))
+        edges[k] = Edge(float(distance[dst]), int(parent[dst]), dst)
+        visited[dst], distance[dst] = True, np.inf
+        row = weight_matrix[dst]
+        closer = (row < distance) & ~visited
+        distance[closer] = row[closer]
+        parent[closer] = dst
+        updates += int(np.count_nonzero(closer))
+    if counts is not None:
+        counts.update(rounds=max(0, length - 1), updates=updates)
+    return edges
+
+
+def prim(
+        weight_matrix: Union[Matrix, GraphM],
+        queue: str = 'auto',
+        counts: Optional[Dict[str, int]] = None,
+) -> List[Edge]:
+    """ Finding minimum spanning tree
+    @param weight_matrix: matrix or GraphM, integral weights of GraphM are known without scanning its matrix
+    @param queue: dense, heap, dial or auto (dense for full matrix, then dial for integral weights of GraphM
+                  up to DIAL_BOUND, heap otherwise, plain matrix is not scanned; dial checks it, radix heap needs
+                  monotone keys)
+    @param counts: if given, gets rounds (added nodes) and updates (lowered keys), pops of queue for heaps
+    """
+    known = None
+    if isinstance(weight_matrix, GraphM):
+        weight_matrix, known = weight_matrix.adjacency_matrix, weight_matrix.weight_bounds()
+    if queue == 'dense' or queue == 'auto' and is_full(weight_matrix):
+        return _prim_dense(weight_matrix, counts)
     length = len(weight_matrix)
     edges: List[Edge] = [Edge(0, 0, 0)] * (length - 1)
-    heap = Heap()
+    heap: Queue = make_queue(queue, length, weight_matrix.matrix, monotone=False, known=known)
+    parent: List[int] = [0] * length
     visited: List[bool] = [False] * length
+    updates = 0
 
     def add(idx: int):
-        """ Add Edges from new node to heap """
+        """ Lower keys of not visited nodes through new node """
+        nonlocal updates
         visited[idx] = True
-        for idy, price in enumerate(weight_matrix[idx]):
-            if price == 0 or visited[idy] or idx == idy:
+        row = weight_matrix[idx]
+        targets = np.flatnonzero(row)
+        for idy, price in zip(targets.tolist(), row[targets].tolist()):
+            if visited[idy] or (idy in heap and heap.key(idy) <= price):
                 continue
-            heap.push(Edge(price, idx, idy))
+            parent[idy] = idx
+            heap.update(idy, price)
+            updates += 1
 
     add(0)
-    k = 0
-    while k < length - 1:
-        was, new_edge = True, None
-        while was:
-            new_edge = heap.pop()
-            was = visited[new_edge.dst]  # check dst node
-        edges[k] = new_edge
-        add(new_edge.dst)
-        k += 1
+    for k in range(length - 1):
+        dst, price = heap.pop()
+        edges[k] = Edge(price, parent[dst], dst)
+        add(dst)
+    if counts is not None:
+        counts.update(rounds=max(0, length - 1), pops=max(0, length - 1), updates=updates)
     return edges
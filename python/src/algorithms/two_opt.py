@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.structures.matrix import Matrix
+
+EPSILON = 1e-10
+
+
+@dataclass
+class LocalSearchResult:
+    """ Improved closed tour, its length and gain of every pass over active nodes """
+    length: float
+    tour: List[int]
+    gains: List[float] = field(default_factory=list)
+
+
+def tour_length(weight_matrix: Matrix, tour: Sequence[int]) -> float:
+    tour = np.asarray(tour)
+    return float(weight_matrix.matrix[tour, np.roll(tour, -1)].sum())
+
+
+def nearest_neighbours(weight_matrix: Matrix, k: int, block: int = 1024) -> np.ndarray:
+    """ (n, k) closest nodes of every node sorted by distance, rows are processed by blocks """
+    length = len(weight_matrix)
+    k = min(k, length - 1)
+    neighbours = np.empty((length, k), dtype=np.int64)
+    for start in range(0, length, block):
+        rows = np.array(weight_matrix.matrix[start:start + block], dtype=np.float64)
+        rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        nearest = np.argpartition(rows, k - 1, axis=1)[:, :k] if k < length - 1 else np.argsort(rows, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1)
+        neighbours[start:start + len(rows)] = np.take_along_axis(nearest, order, axis=1)
+    return neighbours
+
+
+class _Tour:
+    """ Tour array with positions of nodes """
+
+    def __init__(self, tour: Sequence[int]):
+        self.tour = np.array(tour, dtype=np.int64)
+        self.position = np.empty(len(self.tour), dtype=np.int64)
+        self.position[self.tour] = np.arange(len(self.tour))
+
+    def next(self, node: int) -> int:
+        return int(self.tour[(self.position[node] + 1) % len(self.tour)])
+
+    def prev(self, node: int) -> int:
+        return int(self.tour[self.position[node] - 1])
+
+    def reverse(self, first: int, last: int) -> None:
+        """ Reverse path first -> ... -> last, shorter side of the cycle is reversed instead if possible """
+        size = len(self.tour)
+        i, j = int(self.position[first]), int(self.position[last])
+        if 2 * ((j - i) % size + 1) > size:
+            i, j = (j + 1) % size, (i - 1) % size
+        index = (i + np.arange((j - i) % size + 1)) % size
+        self.tour[index] = self.tour[index[::-1]]
+        self.position[self.tour[index]] = index
+
+    def move(self, first: int, last: int, after: int, reverse: bool) -> None:
+        """ Cut path first -> ... -> last and insert it after node "after" """
+        size = len(self.tour)
+        rotated = np.roll(self.tour, -(int(self.position[last]) + 1))
+        count = (int(self.position[last]) - int(self.position[first])) % size + 1
+        segment, rest = rotated[size - count:], rotated[:size - count]
+        if reverse:
+            segment = segment[::-1]
+        place = int(np.flatnonzero(rest == after)[0]) + 1
+        self.tour = np.concatenate([rest[:place], segment, rest[place:]])
+        self.position[self.tour] = np.arange(size)
+
+
+def local_search(
+        weight_matrix: Matrix,
+        tour: Sequence[int],
+        k: int = 10,
+        neighbours: Optional[np.ndarray] = None,
+        or_opt: bool = True,
+        segment: int = 3,
+) -> LocalSearchResult:
+    """ 2-opt and Or-opt with first improvement, candidate lists and don't-look bits
+    @param tour: closed tour over all nodes
+    @param k: size of candidate lists, used if neighbours is None
+    @param neighbours: (n, k) candidate nodes of every node sorted by distance, GridIndex(points).query(k)[1] for points
+    @param or_opt: also move segments of 1..segment nodes between candidate neighbours
+    """
+    distance = weight_matrix.matrix
+    current = _Tour(tour)
+    size = len(current.tour)
+    length = tour_length(weight_matrix, current.tour)
+    if size < 5:
+        return LocalSearchResult(length, current.tour.tolist())
+    if neighbours is None:
+        neighbours = nearest_neighbours(weight_matrix, k)
+    candidates: List[List[int]] = np.asarray(neighbours).tolist()
+
+    def two_opt_move(a: int) -> Optional[List[int]]:
+        for forward in (True, False):
+            a_next = current.next(a) if forward else current.prev(a)
+            removed = distance[a, a_next]
+            for c in candidates[a]:
+                first_gain = removed - distance[a, c]
+                if first_gain <= EPSILON:
+                    break
+                c_next = current.next(c) if forward else current.prev(c)
+                if c_next == a or c == a_next:
+                    continue
+                gain = first_gain + distance[c, c_next] - distance[a_next, c_next]
+                if gain > EPSILON:
+                    if forward:
+                        current.reverse(a_next, c)
+                    else:
+                        current.reverse(c, a_next)
+                    return [a, a_next, c, c_next]
+        return None
+
+    def or_opt_move(a: int) -> Optional[List[int]]:
+        last = a
+        for count in range(1, min(segment, size - 3) + 1):
+            if count > 1:
+                last = current.next(last)
+            prev, after = current.prev(a), current.next(last)
+            removed = distance[prev, a] + distance[last, after] - distance[prev, after]
+            if removed <= EPSILON:
+                continue
+            inside = set(current.tour[(current.position[a] + np.arange(count)) % size].tolist())
+            for end in (a, last):
+                for c in candidates[end]:
+                    if distance[end, c] >= removed:
+                        break
+                    for c_first, c_second in ((c, current.next(c)), (current.prev(c), c)):
+                        if c_first in inside or c_second in inside:
+                            continue
+                        straight = distance[c_first, a] + distance[last, c_second]
+                        reverse = distance[c_first, last] + distance[a, c_second]
+                        added = min(straight, reverse) - distance[c_first, c_second]
+                        if removed - added > EPSILON:
+                            current.move(a, last, c_first, reverse < straight)
+                            return [a, last, prev, after, c_first, c_second]
+        return None
+
+    gains: List[float] = []
+    active = bytearray(b'\x01' * size)
+    queue = current.tour.tolist()
+    while queue:
+        before, touched = length, []
+        for a in queue:
+            active[a] = 0
+            while True:
+                moved = two_opt_move(a) or (or_opt_move(a) if or_opt else None)
+                if moved is None:
+                    break
+                touched.extend(moved)
+        length = tour_length(weight_matrix, current.tour)
+        gains.append(before - length)
+        queue = []
+        for node in touched:
+            if not active[node]:
+                active[node] = 1
+                queue.append(node)
+    return LocalSearchResult(length, current.tour.tolist(), gains)
+
+
+def test():
+    points = np.random.rand(1000, 2)
+    result = local_search(Matrix.weight_matrix(points), list(range(len(points))))
+    print(result.length, result.gains)
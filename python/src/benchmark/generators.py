@@ -0,0 +1,48 @@
+from typing import Optional
+
+import numpy as np
+
+from src.structures.graph import GraphL, GraphM
+from src.structures.grid_index import GridIndex
+
+
+def random_points(nodes: int, seed: int = 0) -> np.ndarray:
+    """ (nodes, 2) points in unit square """
+    return np.random.default_rng(seed).random((nodes, 2))
+
+
+def random_graph(nodes: int, degree: float, seed: int = 0, max_weight: Optional[int] = None) -> GraphL:
+    """ Directed graph with nodes * degree random edges and a ring so every node is reachable
+    @param max_weight: integer weights 1..max_weight, uniform (0, 1] floats if None
+    """
+    random = np.random.default_rng(seed)
+    count = int(nodes * degree)
+    sources = np.concatenate([np.arange(nodes), random.integers(0, nodes, count)])
+    targets = np.concatenate([np.roll(np.arange(nodes), -1), random.integers(0, nodes, count)])
+    if max_weight is None:
+        weights = 1. - random.random(len(sources))
+    else:
+        weights = random.integers(1, max_weight + 1, len(sources)).astype(np.float64)
+    graph = GraphL(nodes)
+    graph.add_edges(sources, targets, weights)
+    return graph
+
+
+def geometric_graph(points: np.ndarray, k: int, scale: Optional[float] = None) -> GraphL:
+    """ Every point connected both ways to its k nearest points, weight is distance
+    @param scale: weights are distances times scale rounded up to integers, euclidean times scale stays a lower bound
+    """
+    weights, nearest = GridIndex(points).query(k)
+    if scale is not None:
+        weights = np.ceil(weights * scale)
+    sources = np.repeat(np.arange(len(points)), nearest.shape[1])
+    targets, weights = nearest.ravel(), weights.ravel()
+    graph = GraphL(len(points))
+    graph.add_edges(np.concatenate([sources, targets]), np.concatenate([targets, sources]),
+                    np.concatenate([weights, weights]))
+    return graph
+
+
+def to_matrix_graph(graph: GraphL) -> GraphM:
+    sources, targets, weights = graph.columns()
+    return GraphM.create_from(list(range(len(graph))), np.stack([sources, targets], axis=1), weights)
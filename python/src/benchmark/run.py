@@ -0,0 +1,212 @@
+import argparse
+import platform
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from functools import cached_property, partial
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from src.algorithms.a_star import a_star
+from src.algorithms.bellman_ford import bellman_ford, bellman_ford_vectorized, spfa
+from src.algorithms.boruvka import boruvka
+from src.algorithms.breadth_first_search import bfs_levels, breadth_first_search
+from src.algorithms.depth_first_search import depth_first_search
+from src.algorithms.dijkstra import bidirectional_dijkstra, shortest_paths
+from src.algorithms.kruskal import kruskal
+from src.algorithms.prim import prim
+from src.algorithms.two_opt import nearest_neighbours
+from src.benchmark.generators import geometric_graph, random_graph, random_points, to_matrix_graph
+from src.structures.graph import GraphCSR, GraphL, GraphM
+from src.structures.grid_index import GridIndex
+from src.structures.matrix import Matrix
+
+ROAD_SCALE = 1000.  # integral weights of geometric graph for dijkstra variants, units per side of square
+Counts = Dict[str, int]
+Case = Tuple[str, str, Callable[[], Callable[[], Counts]]]  # algorithm, variant, setup: builds inputs, returns run
+
+
+@dataclass
+class Measurement:
+    algorithm: str
+    variant: str
+    nodes: int
+    density: float
+    seconds: float
+    peak_bytes: int
+    counts: Counts = field(default_factory=dict)
+
+
+def measure(run: Callable[[], Counts], repeat: int = 1) -> Tuple[float, int, Counts]:
+    """ Best wall time of repeat runs, peak of traced allocations (numpy included) and counts reported by run
+    memory is measured by separate run, tracing slows allocations down
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        seconds = min(seconds, perf_counter() - start)
+    tracemalloc.start()
+    try:
+        counts = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, counts
+
+
+class Inputs:
+    """ Seeded inputs of one scale, every input is built on first use, so --only builds only what it runs """
+
+    def __init__(self, nodes: int, density: float, seed: int):
+        self.nodes = nodes
+        self.density = density
+        self.seed = seed
+        self.target = nodes - 1
+
+    @cached_property
+    def graph(self) -> GraphL:
+        return random_graph(self.nodes, self.density, self.seed)
+
+    @cached_property
+    def csr(self) -> GraphCSR:
+        return GraphCSR.from_graph(self.graph)
+
+    @cached_property
+    def matrix_graph(self) -> GraphM:
+        return to_matrix_graph(self.graph)
+
+    @cached_property
+    def points(self) -> np.ndarray:
+        return random_points(self.nodes, self.seed)
+
+    @cached_property
+    def road(self) -> GraphCSR:
+        """ Geometric graph with integral weights, one input for every dijkstra variant """
+        return GraphCSR.from_graph(geometric_graph(self.points, max(1, int(self.density)), ROAD_SCALE))
+
+    @cached_property
+    def weight_matrix(self) -> Matrix:
+        return Matrix.weight_matrix(self.points)
+
+
+def _counted(algorithm: Callable[..., object], *args, **kwargs) -> Counts:
+    """ Work reported by algorithm through its counts argument """
+    counts: Counts = {}
+    algorithm(*args, counts=counts, **kwargs)
+    return counts
+
+
+def cases(inputs: Inputs) -> Iterator[Case]:
+    """ Every algorithm and implementation variant on inputs of one scale
+    counts are work of the variant: pops and relaxations of queues, passes of Bellman-Ford, rounds and unions of MST
+    """
+    for queue in ('heap', 'dial', 'radix'):  # pops are settled nodes, same as for bidirectional and a_star
+        yield 'dijkstra', queue, lambda queue=queue: partial(
+            _counted, shortest_paths, inputs.road, 0, [inputs.target], queue=queue)
+    yield 'dijkstra', 'bidirectional', lambda: lambda road=inputs.road: {
+        'settled': bidirectional_dijkstra(road, 0, inputs.target).settled}
+    yield 'dijkstra', 'a_star', lambda: lambda road=inputs.road, points=inputs.points: {
+        'settled': a_star(road, 0, inputs.target, points, scale=ROAD_SCALE).settled}
+
+    yield 'bellman_ford', 'passes', lambda: partial(_counted, bellman_ford, inputs.graph, 0)
+    yield 'bellman_ford', 'spfa', lambda: partial(_counted, spfa, inputs.graph, 0)
+    yield 'bellman_ford', 'vectorized', lambda: partial(_counted, bellman_ford_vectorized, inputs.graph, 0)
+
+    yield 'mst', 'prim_heap', lambda: partial(_counted, prim, inputs.weight_matrix, 'heap')
+    yield 'mst', 'prim_dense', lambda: partial(_counted, prim, inputs.weight_matrix, 'dense')
+    yield 'mst', 'kruskal', lambda: partial(_counted, kruskal, inputs.graph)
+    yield 'mst', 'boruvka', lambda: partial(_counted, boruvka, inputs.graph)
+
+    yield 'bfs', 'queue', lambda: lambda csr=inputs.csr: {'visited': len(breadth_first_search(csr, 0))}
+    yield 'bfs', 'levels', lambda: lambda csr=inputs.csr: {
+        'visited': int(np.count_nonzero(bfs_levels(csr, 0) >= 0))}
+    yield 'bfs', 'matrix', lambda: lambda graph=inputs.matrix_graph: {'visited': len(breadth_first_search(graph, 0))}
+    yield 'dfs', 'stack', lambda: lambda csr=inputs.csr: {'visited': len(depth_first_search(csr, 0))}
+
+    yield 'knn', 'grid', lambda: lambda points=inputs.points: {'neighbours': GridIndex(points).query(10)[1].size}
+    yield 'knn', 'matrix', lambda: lambda points=inputs.points: {
+        'neighbours': nearest_neighbours(Matrix.weight_matrix(points), 10).size}
+
+    for dtype in (np.float64, np.float32):
+        yield 'weight_matrix', np.dtype(dtype).name, lambda dtype=dtype: lambda points=inputs.points: {
+            'bytes': Matrix.weight_matrix(points, dtype=dtype).matrix.nbytes}
+
+
+def benchmark(
+        scales: List[int],
+        densities: List[float],
+        seed: int = 0,
+        only: Optional[str] = None,
+        repeat: int = 1,
+) -> List[Measurement]:
+    results = []
+    for nodes in scales:
+        for density in densities:
+            for algorithm, variant, setup in cases(Inputs(nodes, density, seed)):
+                if only is not None and only != algorithm:
+                    continue
+                seconds, peak, counts = measure(setup(), repeat)
+                results.append(Measurement(algorithm, variant, nodes, density, seconds, peak, counts))
+                print(f'{algorithm:>14} {variant:>14} n={nodes:<7} d={density:<4} '
+                      f'{seconds * 1000:10.2f}ms {peak / 2 ** 20:9.2f}MiB {counts}', file=sys.stderr)
+    return results
+
+
+def compare(current: List[dict], previous: List[dict], threshold: float) -> List[str]:
+    """ Cases slower (or using more memory) than in previous results by more than threshold """
+    key = lambda item: (item['algorithm'], item['variant'], item['nodes'], item['density'])
+    before = {key(item): item for item in previous}
+    regressions = []
+    for item in current:
+        old = before.get(key(item))
+        if old is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if old[metric] > 0 and item[metric] > old[metric] * (1 + threshold):
+                regressions.append(f'{key(item)} {metric}: {old[metric]} -> {item[metric]}')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark graph algorithms on seeded random inputs')
+    parser.add_argument('--scales', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--densities', type=float, nargs='+', default=[3, 10])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', help='run one algorithm, for example dijkstra')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per case, best time is kept')
+    parser.add_argument('--output', help='json file for results')
+    parser.add_argument('--compare', help='json file of previous results, exit code 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown for --compare')
+    args = parser.parse_args()
+
+    results = [asdict(item) for item in benchmark(args.scales, args.densities, args.seed, args.only, args.repeat)]
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'wb') as file:
+            file.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    else:
+        print(orjson.dumps(report).decode())
+
+    if args.compare:
+        with open(args.compare, 'rb') as file:
+            regressions = compare(results, orjson.loads(file.read())['results'], args.threshold)
+        for regression in regressions:
+            print('regression:', regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.boxer.models import Order, Track
+from src.boxer.spatial import BoxIndex
+
+CHUNK_SIZE = 1 << 16  # candidates x placed boxes computed at once
+PREFILTER_SIZE = 256  # from so many placed boxes candidates are checked by cells against boxes from BoxIndex
+
+
+class PlacedBoxes:
+    """ Placed boxes as rows (x, y, z, length, width, height) of one array
+    it is a stack like placements: pushed when search goes deeper and popped when it goes back (see PackingState)
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._boxes = np.empty((capacity, 6), dtype=np.float64)
+        self.size = 0
+        self.fragile = 0  # placed fragile orders
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self._boxes[:self.size]
+
+    def push(self, order: Order) -> None:
+        if self.size == len(self._boxes):
+            self._boxes = np.concatenate([self._boxes, np.empty_like(self._boxes)])
+        box = order.box
+        self._boxes[self.size] = box.x, box.y, box.z, box.length, box.width, box.height
+        self.size += 1
+        self.fragile += order.fragility
+
+    def pop(self, order: Order) -> None:
+        """ Remove last pushed order """
+        self.size -= 1
+        self.fragile -= order.fragility
+
+
+def feasible_placements(
+        placed: PlacedBoxes,
+        candidates: np.ndarray,
+        track: Track,
+        alpha: float,
+        betta: float,
+        index: Optional[BoxIndex] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Мы должны проверить для всех кандидатов сразу:
+    - коробка может там быть, стоять, существовать, реально достать
+    - 6 дополнительных экстремальных точек
+    @param candidates: (c, 6) коробки (x, y, z, length, width, height)
+    @param index: те же коробки в сетке, с PREFILTER_SIZE коробок кандидаты одной клетки проверяются только
+    по коробкам, которые могут на них влиять (в порядке укладки, поэтому суммы площадей те же),
+    а клетка, доступ к которой закрыт целиком, не проверяется: ее точки nan
+    @return: (c,) подходит ли коробка, (c, 6, 3) экстремальные точки - проекции 3 точек на плоскости
+    (x, y, z + h), (x, y + w, z), (x + l, y, z); та же арифметика, что и по одной коробке, поэтому результат тот же
+    """
+    feasible = np.empty(len(candidates), dtype=bool)
+    points = np.empty((len(candidates), 6, 3), dtype=np.float64)
+    prefilter = index is not None and len(placed) >= PREFILTER_SIZE
+    groups = index.groups(candidates) if prefilter else [np.arange(len(candidates))]
+    blocked = _blocked(placed, candidates, groups) if prefilter else np.zeros(1, dtype=bool)
+    for group, closed in zip(groups, blocked.tolist()):
+        if closed:
+            feasible[group], points[group] = False, np.nan
+            continue
+        boxes = placed.boxes[index.relevant(candidates[group], betta)] if prefilter else placed.boxes
+        step = max(1, CHUNK_SIZE // max(1, len(boxes)))
+        for start in range(0, len(group), step):
+            chunk = group[start:start + step]
+            feasible[chunk], points[chunk] = _check(boxes, placed.fragile, candidates[chunk], track, alpha, betta)
+    return feasible, points
+
+
+def _blocked(placed: PlacedBoxes, candidates: np.ndarray, groups: List[np.ndarray]) -> np.ndarray:
+    """ (groups,) some box ahead of all candidates of group misses all of them by y or z,
+    so it closes access for every one, as (ax > ex) & ~(y_overlap & z_overlap) of _check
+    """
+    ordered = candidates[np.concatenate(groups)]
+    starts = np.cumsum([0] + [len(group) for group in groups[:-1]])
+    by, bz = ordered[:, 1], ordered[:, 2]
+    front = np.maximum.reduceat(ordered[:, 0] + ordered[:, 3], starts)[:, None]
+    left, right = np.minimum.reduceat(by, starts)[:, None], np.maximum.reduceat(by + ordered[:, 4], starts)[:, None]
+    bottom, top = np.minimum.reduceat(bz, starts)[:, None], np.maximum.reduceat(bz + ordered[:, 5], starts)[:, None]
+    blocked = np.zeros(len(groups), dtype=bool)
+    ax, ay, az, _, aw, ah = (column[None, :] for column in placed.boxes.T)
+    step = max(1, CHUNK_SIZE // len(placed))
+    for start in range(0, len(groups), step):
+        chunk = slice(start, start + step)
+        missed = (ay + aw <= left[chunk]) | (ay >= right[chunk]) | (az + ah <= bottom[chunk]) | (az >= top[chunk])
+        blocked[chunk] = ((ax > front[chunk]) & missed).any(axis=1)
+    return blocked
+
+
+def _check(
+        boxes: np.ndarray,
+        fragile: int,
+        candidates: np.ndarray,
+        track: Track,
+        alpha: float,
+        betta: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    bx, by, bz, bl, bw, bh = candidates.T
+    ex, ey, ez = bx + bl, by + bw, bz + bh
+    points = np.stack([
+        np.stack([np.zeros_like(bx), by, ez], axis=1),  # 0 x
+        np.stack([bx, np.zeros_like(bx), ez], axis=1),  # 1 y
+        np.stack([np.zeros_like(bx), ey, bz], axis=1),  # 2 x
+        np.stack([bx, ey, np.zeros_like(bx)], axis=1),  # 3 z
+        np.stack([ex, by, np.zeros_like(bx)], axis=1),  # 4 z
+        np.stack([ex, np.zeros_like(bx), bz], axis=1),  # 5 y
+    ], axis=1)
+    feasible = (ex < track.length) & (ey < track.width) & (ez < track.height)  # в пределах объема
+    lifted = bz != 0
+    if fragile:  # заказ под ним не хрупкий
+        feasible &= ~lifted
+    if not len(boxes):  # опоры нет, поднятая коробка проходит только при alpha = 0
+        return feasible & ~(lifted & (0. < alpha)), points
+
+    ax, ay, az, al, aw, ah = (column[None, :] for column in boxes.T)
+    fx, fy, fz = ax + al, ay + aw, az + ah
+    bx, by, bz, ex, ey, ez = (column[:, None] for column in (bx, by, bz, ex, ey, ez))
+
+    x_overlap, y_overlap, z_overlap = (ex > ax) & (fx > bx), (ey > ay) & (fy > by), (ez > az) & (fz > bz)
+    feasible &= ~(x_overlap & y_overlap & z_overlap).any(axis=1)  # с кем-то пересекается
+    feasible &= ~(y_overlap & (fx - ex > betta)).any(axis=1)  # не попали в длину достижимости
+    feasible &= ~((ax > ex) & ~(y_overlap & z_overlap)).any(axis=1)  # перекрывает доступ для укладки
+
+    # поддерживающая площадь суммируется по порядку укладки, как и по одной коробке
+    area = np.maximum(0., np.minimum(ex, fx) - np.maximum(bx, ax))
+    area *= np.maximum(0., np.minimum(ey, fy) - np.maximum(by, ay))
+    support_area = np.add.accumulate(np.where(fz == bz, area, 0.), axis=1)[:, -1]
+    feasible &= ~(lifted & (support_area / (bw * bl) < alpha))  # не попали в минимальную поддерживающую площадь
+
+    # 0, 1: (x, y, z + h) проекция на: zy (x++; (x - ?, y, z + h)), zx (y++; (x, y - ?, z + h))
+    # 2, 3: (x, y + w, z) проекция на: zy (x++; (x - ?, y + w, z)), xy (z++; (x, y + w, z - ?))
+    # 4, 5: (x + l, y, z) проекция на: xy (z++; (x + l, y, z - ?)), xz (y++; (x + l, y - ?, z))
+    behind_x, behind_y, behind_z = (0 <= ax) & (ax <= bx), (0 <= ay) & (ay <= by), (0 <= az) & (az <= bz)
+    projections = [
+        (0, 0, behind_x & (ay <= by) & (by <= fy) & (az <= ez) & (ez <= fz), fx, bx),
+        (2, 0, behind_x & (ay <= ey) & (ey <= fy) & (az <= bz) & (bz <= fz), fx, bx),
+        (1, 1, behind_y & (ax <= bx) & (bx <= fx) & (az <= ez) & (ez <= fz), fy, by),
+        (5, 1, behind_y & (ax <= ex) & (ex <= fx) & (az <= bz) & (bz <= fz), fy, by),
+        (3, 2, behind_z & (ax <= bx) & (bx <= fx) & (ay <= ey) & (ey <= fy), fz, bz),
+        (4, 2, behind_z & (ax <= ex) & (ex <= fx) & (ay <= by) & (by <= fy), fz, bz),
+    ]
+    for point, axis, mask, end, start in projections:
+        moved = np.where(mask, np.minimum(end, start), -np.inf).max(axis=1)
+        points[:, point, axis] = np.maximum(points[:, point, axis], moved)
+    return feasible, points
@@ -0,0 +1,104 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from src.boxer.models import Box, Order, Track
+
+DIVISIONS = 8  # cells of grid along the shortest side of track, cells are close to cubes
+
+Region = Tuple[Tuple[float, float], Tuple[float, float], Tuple[float, float]]  # closed (low, high) along x, y, z
+
+
+class BoxIndex:
+    """ Uniform grid over track for placed boxes
+    it is a stack like PlacedBoxes and keeps the same row numbers: boxes are pushed when search goes deeper
+    and popped when it goes back (see PackingState); every box is kept in all cells its closed box touches
+    queries return supersets of rows in order of placing, feasible_placements checks them exactly
+    """
+
+    def __init__(self, track: Track, divisions: int = DIVISIONS):
+        sides = (track.length, track.width, track.height)
+        side = min((value for value in sides if value > 0), default=1.) / divisions
+        self.divisions = tuple(max(1, round(value / side)) for value in sides)
+        self.cell = tuple(value / count for value, count in zip(sides, self.divisions))
+        self.size = 0
+        self.cells: List[List[int]] = [[] for _ in range(self.divisions[0] * self.divisions[1] * self.divisions[2])]
+        self.starts: List[List[int]] = [[] for _ in range(self.divisions[0])]  # by cell of x
+        self.ends: List[List[int]] = [[] for _ in range(self.divisions[0])]  # by cell of x + length
+        self._registered: List[Tuple[List[int], int, int]] = []  # cells, start and end of every box
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _axis(self, value: float, axis: int) -> int:
+        if self.cell[axis] <= 0:
+            return 0
+        return min(max(int(value / self.cell[axis]), 0), self.divisions[axis] - 1)
+
+    def _region_cells(self, region: Region) -> List[int]:
+        """ Cells touched by closed region """
+        (xs, xe), (ys, ye), (zs, ze) = ((self._axis(low, axis), self._axis(high, axis))
+                                        for axis, (low, high) in enumerate(region))
+        return [(x * self.divisions[1] + y) * self.divisions[2] + z
+                for x in range(xs, xe + 1) for y in range(ys, ye + 1) for z in range(zs, ze + 1)]
+
+    def push(self, order: Order) -> None:
+        box: Box = order.box
+        registered = self._region_cells(((box.x, box.x + box.length), (box.y, box.y + box.width),
+                                         (box.z, box.z + box.height)))
+        start, end = self._axis(box.x, 0), self._axis(box.x + box.length, 0)
+        for cell in registered:
+            self.cells[cell].append(self.size)
+        self.starts[start].append(self.size)
+        self.ends[end].append(self.size)
+        self._registered.append((registered, start, end))
+        self.size += 1
+
+    def pop(self, order: Order) -> None:
+        """ Remove last pushed order, it is the last one in all its lists """
+        registered, start, end = self._registered.pop()
+        for cell in registered:
+            self.cells[cell].pop()
+        self.starts[start].pop()
+        self.ends[end].pop()
+        self.size -= 1
+
+    def touching(self, regions: List[Region]) -> List[int]:
+        """ Rows of boxes sharing a cell with any of closed regions, repeated """
+        cells = {cell for region in regions for cell in self._region_cells(region)}
+        return [row for cell in cells for row in self.cells[cell]]
+
+    def starting_after(self, x: float) -> List[int]:
+        """ Superset of rows with box.x > x """
+        return [row for cell in self.starts[self._axis(x, 0):] for row in cell]
+
+    def ending_after(self, x: float) -> List[int]:
+        """ Superset of rows with box.x + box.length > x, one more cell is taken for rounding of x """
+        return [row for cell in self.ends[max(self._axis(x, 0) - 1, 0):] for row in cell]
+
+    def groups(self, candidates: np.ndarray) -> List[np.ndarray]:
+        """ Indexes of candidates grouped by cell of their corner (x, y, z) """
+        cell = np.maximum(np.array(self.cell), np.finfo(np.float64).tiny)
+        cells = np.clip((candidates[:, :3] / cell).astype(np.int64), 0, np.array(self.divisions) - 1)
+        flat = (cells[:, 0] * self.divisions[1] + cells[:, 1]) * self.divisions[2] + cells[:, 2]
+        order = np.argsort(flat, kind='stable')
+        return np.split(order, np.flatnonzero(np.diff(flat[order])) + 1)
+
+    def relevant(self, candidates: np.ndarray, betta: float) -> np.ndarray:
+        """ Sorted rows of boxes that can change result of feasible_placements for candidates
+        @param candidates: (c, 6) boxes (x, y, z, length, width, height) close to each other, superset grows with
+        their spread: boxes overlapping or supporting them, boxes ahead along x (access and reach) and boxes
+        on lines from their corners to walls (projections of extreme points)
+        """
+        bx, by, bz = candidates[:, 0], candidates[:, 1], candidates[:, 2]
+        ex, ey, ez = bx + candidates[:, 3], by + candidates[:, 4], bz + candidates[:, 5]
+        x, y, z, front, right, top = ((float(values.min()), float(values.max())) for values in (bx, by, bz, ex, ey, ez))
+        rows = self.touching([
+            ((x[0], front[1]), (y[0], right[1]), (z[0], top[1])),  # пересекающиеся и опоры
+            ((0., x[1]), y, top), ((0., x[1]), right, z),  # проекции по x
+            (x, (0., y[1]), top), (front, (0., y[1]), z),  # проекции по y
+            (x, right, (0., z[1])), (front, y, (0., z[1])),  # проекции по z
+        ])
+        rows += self.starting_after(front[0])
+        rows += self.ending_after(front[0] + betta)
+        return np.unique(np.array(rows, dtype=np.int64))
@@ -0,0 +1,112 @@
+from typing import Iterable, List, Optional, Set, Tuple
+
+from src.boxer.feasibility import PlacedBoxes
+from src.boxer.models import Box, Coord, Coords, Order, Orders, Track
+from src.boxer.spatial import BoxIndex
+
+Point = Tuple[float, float, float]
+
+
+def is_hidden(point: Point, box: Box) -> bool:
+    """ Extreme point is not extreme anymore after box is placed """
+    x, y, z = point
+    min_z, max_z = box.z, box.z + box.height
+    min_y, max_y = box.y, box.y + box.width
+    min_x, max_x = box.x, box.x + box.length
+
+    # за коробкой, не включая верхнуюю и правую грань области
+    if 0 <= x <= box.x and min_y <= y < max_y and min_z <= z < max_z:
+        return True
+    # на левой грани, не включая верхнее и ближнее ребро
+    if y == box.y and min_x <= x < max_x and min_z <= z < max_z:
+        return True
+    # на нижней грани, не включая ближнее и правое ребро
+    if z == box.z and min_x <= x < max_x and min_y <= y < max_y:
+        return True
+    return False
+
+
+class Placement:
+    """ Order placed after parent placement, children share chain of their parent
+    removed and added extreme points are found once, when placement is applied to state of parent
+    """
+    __slots__ = ('order', 'points', 'parent', 'length', 'removed', 'added')
+
+    def __init__(self, order: Order, points: Optional[Coords], parent: Optional['Placement']):
+        self.order = order
+        self.points = points  # new extreme points, None - extreme points are given with chain
+        self.parent = parent
+        self.length: int = 1 if parent is None else parent.length + 1
+        self.removed: Optional[Set[Point]] = None if points is not None else set()
+        self.added: Optional[Set[Point]] = None if points is not None else set()
+
+    @staticmethod
+    def chain(orders: Iterable[Order]) -> Optional['Placement']:
+        """ Chain of already placed orders, extreme points for them are given separately """
+        placement = None
+        for order in orders:
+            placement = Placement(order, None, placement)
+        return placement
+
+    def orders(self) -> Orders:
+        """ Placed orders from first, O(length) """
+        orders, placement = [], self
+        while placement is not None:
+            orders.append(placement.order)
+            placement = placement.parent
+        return orders[::-1]
+
+
+class PackingState:
+    """ Extreme points, placed boxes and their index for one placement chain, shared by all nodes of search
+    moving to other chain undoes placements up to common parent and applies the rest,
+    so going deeper or back by one node costs O(changed points) instead of copying everything
+    """
+
+    def __init__(self, placement: Optional[Placement], extreme_points: Coords, track: Track):
+        self.boxes = PlacedBoxes()
+        self.index = BoxIndex(track)
+        for order in ([] if placement is None else placement.orders()):
+            self.boxes.push(order)
+            self.index.push(order)
+        self.points: Set[Point] = {(point.x, point.y, point.z) for point in extreme_points}
+        self.top = placement
+
+    def coords(self, placement: Optional[Placement]) -> Coords:
+        self.restore(placement)
+        return [Coord(*point) for point in self.points]
+
+    def restore(self, placement: Optional[Placement]) -> None:
+        path: List[Placement] = []
+        while placement is not self.top:
+            if placement is None or self.top is not None and self.top.length >= placement.length:
+                self._undo()
+            else:
+                path.append(placement)
+                placement = placement.parent
+        for placement in reversed(path):
+            self._apply(placement)
+
+    def _apply(self, placement: Placement) -> None:
+        if placement.removed is None:
+            box = placement.order.box
+            placement.removed = {point for point in self.points if is_hidden(point, box)}
+            placement.added = {
+                point for point in ((point.x, point.y, point.z) for point in placement.points)
+                if point not in self.points or point in placement.removed
+            }
+        self.points -= placement.removed
+        self.points |= placement.added
+        self.boxes.push(placement.order)
+        self.index.push(placement.order)
+        self.top = placement
+
+    def _undo(self) -> None:
+        placement = self.top
+        if placement.points is None:
+            raise ValueError('placements given with extreme points can not be undone')
+        self.points -= placement.added
+        self.points |= placement.removed
+        self.boxes.pop(placement.order)
+        self.index.pop(placement.order)
+        self.top = placement.parent
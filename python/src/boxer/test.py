@@ -30,7 +30,7 @@ while root.state() != 2:
     # from time import sleep
     # sleep(0.5)
 
-    if len(node.free_orders) == 0:
+    if node.free_count == 0:
         break
 
     if not node.check_step():
@@ -0,0 +1,218 @@
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from src.structures.heap import IndexedHeap
+
+DIAL_BOUND = 1024
+INSPECT_CHUNK = 1 << 16  # weights read at once when checking them
+
+
+@dataclass
+class BucketQueue:
+    """ Dial queue: integer keys, all keys inside queue fit into window [min, min + max_weight] """
+    capacity: int
+    max_weight: int
+    buckets: List[Set[int]] = field(default_factory=list, init=False, repr=False)
+    keys: List[int] = field(default_factory=list, init=False, repr=False)
+    cursor: int = field(default=0, init=False)
+    size: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self.buckets = [set() for _ in range(self.max_weight + 1)]
+        self.keys = [-1] * self.capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, item: int) -> bool:
+        return self.keys[item] != -1
+
+    def contains(self, item: int) -> bool:
+        return self.keys[item] != -1
+
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def key(self, item: int) -> int:
+        return self.keys[item]
+
+    def push(self, item: int, key: int) -> None:
+        if self.keys[item] != -1:
+            raise ValueError(f'{item} is already in queue')
+        key = int(key)
+        if self.size == 0 or key < self.cursor:
+            self.cursor = key
+        self.keys[item] = key
+        self.buckets[key % len(self.buckets)].add(item)
+        self.size += 1
+
+    def pop(self) -> Tuple[int, int]:
+        if self.size == 0:
+            raise IndexError('pop from empty queue')
+        while not self.buckets[self.cursor % len(self.buckets)]:
+            self.cursor += 1
+        item = self.buckets[self.cursor % len(self.buckets)].pop()
+        self.keys[item] = -1
+        self.size -= 1
+        return item, self.cursor
+
+    def decrease_key(self, item: int, key: int) -> None:
+        if self.keys[item] == -1:
+            raise KeyError(item)
+        if key > self.keys[item]:
+            raise ValueError(f'new key {key} is greater than current {self.keys[item]}')
+        self.update(item, key)
+
+    def update(self, item: int, key: int) -> None:
+        if self.keys[item] != -1:
+            self.buckets[self.keys[item] % len(self.buckets)].discard(item)
+            self.keys[item] = -1
+            self.size -= 1
+        self.push(item, key)
+
+
+@dataclass
+class RadixHeap:
+    """ Radix heap: integer keys, never below the last popped key (dijkstra, not prim) """
+    capacity: int
+    buckets: List[Set[int]] = field(default_factory=list, init=False, repr=False)
+    keys: List[int] = field(default_factory=list, init=False, repr=False)
+    places: List[int] = field(default_factory=list, init=False, repr=False)
+    last: int = field(default=0, init=False)
+    size: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self.buckets = [set() for _ in range(65)]
+        self.keys = [-1] * self.capacity
+        self.places = [-1] * self.capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, item: int) -> bool:
+        return self.places[item] != -1
+
+    def contains(self, item: int) -> bool:
+        return self.places[item] != -1
+
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def key(self, item: int) -> int:
+        return self.keys[item]
+
+    def _place(self, item: int, key: int) -> None:
+        place = (key ^ self.last).bit_length()
+        self.keys[item], self.places[item] = key, place
+        self.buckets[place].add(item)
+
+    def push(self, item: int, key: int) -> None:
+        if self.places[item] != -1:
+            raise ValueError(f'{item} is already in heap')
+        key = int(key)
+        if key < self.last:
+            raise ValueError(f'key {key} is less than last popped {self.last}')
+        self._place(item, key)
+        self.size += 1
+
+    def pop(self) -> Tuple[int, int]:
+        if self.size == 0:
+            raise IndexError('pop from empty heap')
+        if not self.buckets[0]:
+            place = next(place for place, bucket in enumerate(self.buckets) if bucket)
+            bucket, self.buckets[place] = self.buckets[place], set()
+            self.last = min(self.keys[item] for item in bucket)
+            for item in bucket:
+                self._place(item, self.keys[item])
+        item = self.buckets[0].pop()
+        self.places[item] = -1
+        self.size -= 1
+        return item, self.keys[item]
+
+    def decrease_key(self, item: int, key: int) -> None:
+        if self.places[item] == -1:
+            raise KeyError(item)
+        if key > self.keys[item]:
+            raise ValueError(f'new key {key} is greater than current {self.keys[item]}')
+        self.update(item, key)
+
+    def update(self, item: int, key: int) -> None:
+        if self.places[item] != -1:
+            self.buckets[self.places[item]].discard(item)
+            self.places[item] = -1
+            self.size -= 1
+        self.push(item, key)
+
+
+Queue = Union[IndexedHeap, BucketQueue, RadixHeap]
+
+
+def integral_weights(weights: np.ndarray) -> Tuple[bool, int]:
+    """ Whether all weights are finite non-negative integers and the largest one (0 if not), read chunk by chunk """
+    flat = np.asarray(weights).reshape(-1)
+    max_weight = 0
+    for start in range(0, flat.size, INSPECT_CHUNK):
+        chunk = flat[start:start + INSPECT_CHUNK]
+        if np.issubdtype(chunk.dtype, np.floating) and not np.isfinite(chunk).all():
+            return False, 0
+        if chunk.min() < 0:
+            return False, 0
+        if np.issubdtype(chunk.dtype, np.floating) and not np.array_equal(chunk, np.floor(chunk)):
+            return False, 0
+        max_weight = max(max_weight, int(chunk.max()))
+    return True, max_weight
+
+
+def queue_factory(
+        kind: str,
+        weights: np.ndarray,
+        monotone: bool = True,
+        known: Optional[Tuple[bool, int]] = None,
+) -> Callable[[int], Queue]:
+    """ Constructor of priority queue for dijkstra ("monotone" keys) or prim, weights are inspected once
+    @param kind: heap, dial, radix or auto (dial for non-negative integers up to DIAL_BOUND,
+                 radix for larger integers when keys are monotone, heap otherwise);
+                 without known auto never reads a dense (2-d) matrix, it takes heap there,
+                 scanning V^2 would cost more than search
+    @param weights: edge weights, zeros are allowed
+    @param monotone: popped keys never decrease
+    @param known: (all weights are integral, upper bound of weights) kept by owner of weights, see GraphM.weight_bounds,
+                  weights are not inspected then
+    """
+    if kind == 'heap' or kind == 'auto' and known is None and weights.ndim > 1:
+        return IndexedHeap
+
+    integral, max_weight = integral_weights(weights) if known is None else known
+    if kind == 'auto':
+        if not integral:
+            kind = 'heap'
+        elif max_weight <= DIAL_BOUND:
+            kind = 'dial'
+        else:
+            kind = 'radix' if monotone else 'heap'
+
+    if kind == 'heap':
+        return IndexedHeap
+    if kind not in ('dial', 'radix'):
+        raise ValueError(f'unknown queue: {kind}')
+    if not integral:
+        raise ValueError(f'{kind} queue needs non-negative integer weights')
+    if kind == 'dial':
+        return partial(BucketQueue, max_weight=max_weight)
+    if not monotone:
+        raise ValueError('radix heap needs monotone keys')
+    return RadixHeap
+
+
+def make_queue(
+        kind: str,
+        capacity: int,
+        weights: np.ndarray,
+        monotone: bool = True,
+        known: Optional[Tuple[bool, int]] = None,
+) -> Queue:
+    """ Priority queue for capacity nodes, see queue_factory """
+    return queue_factory(kind, weights, monotone, known)(capacity)
@@ -0,0 +1,34 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class DisjointSet:
+    """ Union-find with path compression and union by rank """
+    size: int
+    parent: List[int] = field(default_factory=list, init=False, repr=False)
+    rank: List[int] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        self.parent = list(range(self.size))
+        self.rank = [0] * self.size
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: int, second: int) -> bool:
+        """ Join sets, False if they are already one set """
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        if self.rank[first] < self.rank[second]:
+            first, second = second, first
+        self.parent[second] = first
+        if self.rank[first] == self.rank[second]:
+            self.rank[first] += 1
+        return True
@@ -1,21 +1,30 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import List, TypeVar, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, TypeVar, Optional, Tuple, Union
 
+import numpy as np
+
+from src.structures.bucket import integral_weights
 from src.structures.matrix import Matrix
+from src.structures.storage import load_arrays, save_arrays
 
 T = TypeVar('T')
+Listener = Callable[[int, int, float, float], None]  # first node, second node, old weight, new weight
+
+EDGES_CHUNK = 1 << 16
 
 
 @dataclass
 class Node:
+    __slots__ = ('data', 'index')
     data: T
     index: int
 
 
 @dataclass(order=True)
 class Edge:
+    __slots__ = ('price', 'src', 'dst')
     price: float
     src: int
     dst: int
@@ -27,34 +36,114 @@ class Edge:
         return str(self)
 
 
-@dataclass
+@dataclass(eq=False)
 class GraphL:
-    """ Graph over list adjacency """
+    """ Graph over list adjacency, edges are kept in typed columns growing by doubling """
     nodes: int
-    edges: List[Tuple[int, int, float]] = field(default_factory=list)
+    size: int = field(default=0, init=False)
+    _sources: np.ndarray = field(init=False, repr=False)
+    _destinations: np.ndarray = field(init=False, repr=False)
+    _weights: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        index_type = np.int32 if self.nodes <= np.iinfo(np.int32).max else np.int64
+        self._sources = np.empty(16, dtype=index_type)
+        self._destinations = np.empty(16, dtype=index_type)
+        self._weights = np.empty(16, dtype=np.float64)
 
     def __len__(self) -> int:
         return self.nodes
 
     def __str__(self) -> str:
-        return f'{self.edges}'
+        return f'{list(self.edges)}'
 
     def __repr__(self):
         return str(self)
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GraphL):
+            return NotImplemented
+        return self.nodes == other.nodes and all(
+            np.array_equal(first, second) for first, second in zip(self.columns(), other.columns()))
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float]]:
+        return self.edges
+
+    @property
+    def edges(self) -> Iterator[Tuple[int, int, float]]:
+        """ (u, v, w) triples, columns are converted chunk by chunk """
+        for start in range(0, self.size, EDGES_CHUNK):
+            end = min(start + EDGES_CHUNK, self.size)
+            yield from zip(
+                self._sources[start:end].tolist(),
+                self._destinations[start:end].tolist(),
+                self._weights[start:end].tolist(),
+            )
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Views of sources, destinations and weights, stay valid after the graph grows """
+        return self._sources[:self.size], self._destinations[:self.size], self._weights[:self.size]
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> GraphL:
+        """ Load graph written by save, columns are memory-mapped and copied on first add_edge """
+        arrays, meta = load_arrays(path, 'graph_l', mmap)
+        graph = GraphL(meta['nodes'])
+        graph._sources, graph._destinations, graph._weights = arrays['sources'], arrays['destinations'], arrays['weights']
+        graph.size = len(graph._sources)
+        return graph
+
+    def save(self, path: str) -> None:
+        sources, destinations, weights = self.columns()
+        save_arrays(path, 'graph_l', {'sources': sources, 'destinations': destinations, 'weights': weights},
+                    {'nodes': self.nodes})
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._sources)
+        if size <= capacity:
+            return
+        capacity = max(capacity, 16)  # loaded empty graph has zero-length columns
+        while capacity < size:
+            capacity *= 2
+        for name in ('_sources', '_destinations', '_weights'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
     def add_edge(self, u: int, v: int, w: float) -> None:
         """ Add edge """
-        self.edges.append((u, v, w))
+        self._reserve(self.size + 1)
+        self._sources[self.size], self._destinations[self.size], self._weights[self.size] = u, v, w
+        self.size += 1
+
+    def add_edges(self, sources: np.ndarray, destinations: np.ndarray, weights: np.ndarray) -> None:
+        """ Add edge columns at once """
+        count = len(sources)
+        self._reserve(self.size + count)
+        self._sources[self.size:self.size + count] = sources
+        self._destinations[self.size:self.size + count] = destinations
+        self._weights[self.size:self.size + count] = weights
+        self.size += count
 
 
 @dataclass
 class GraphM:
     """ Graph over matrix adjacency """
     nodes: List[Node]
-    adjacency_matrix: Matrix = field(init=False)
+    adjacency_matrix: Optional[Matrix] = None
+    _index: Optional[Dict[T, Node]] = field(default=None, init=False, repr=False, compare=False)
+    _listeners: List[Listener] = field(default_factory=list, init=False, repr=False, compare=False)
+    _bounds: Optional[Tuple[bool, int]] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        self.adjacency_matrix = Matrix(len(self.nodes))
+        if self.adjacency_matrix is None:
+            self.adjacency_matrix = Matrix(len(self.nodes))
+            self._bounds = True, 0
+        try:
+            self._index = {node.data: node for node in reversed(self.nodes)}  # first match wins
+        except TypeError:  # unhashable data, index_of falls back to scan
+            self._index = None
 
     def __getitem__(self, index: int) -> Node:
         return self.nodes[index]
@@ -69,38 +158,138 @@ class GraphM:
         return str(self)
 
     @staticmethod
-    def create_from(nodes: List[T]) -> GraphM:
-        """ Creates graph from list of something """
-        temp = [Node(0, 0)] * len(nodes)
-        for idx, data in enumerate(nodes):
-            temp[idx] = Node(data, idx)
-        return GraphM(temp)
+    def create_from(
+            nodes: List[T],
+            edges: Optional[np.ndarray] = None,
+            weights: Union[float, np.ndarray] = 1,
+            symmetric: bool = False,
+    ) -> GraphM:
+        """ Creates graph from list of something
+        @param nodes: data of nodes
+        @param edges: (E, 2) array of node indexes
+        @param weights: one weight for all edges or (E,) array
+        @param symmetric: connect edges both ways
+        """
+        graph = GraphM([Node(data, idx) for idx, data in enumerate(nodes)])
+        if edges is not None:
+            edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+            graph.connect_many(edges[:, 0], edges[:, 1], weights, symmetric)
+        return graph
+
+    @staticmethod
+    def from_matrix(matrix: Matrix, nodes: Optional[List[T]] = None) -> GraphM:
+        """ Creates graph over existing (possibly memory-mapped) matrix, rows are read on demand """
+        nodes = range(len(matrix)) if nodes is None else nodes
+        return GraphM([Node(data, idx) for idx, data in enumerate(nodes)], matrix)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> GraphM:
+        """ Load graph written by save, adjacency matrix is memory-mapped read-only by default """
+        arrays, meta = load_arrays(path, 'graph_m', mmap)
+        return GraphM.from_matrix(Matrix.from_array(arrays['matrix']), meta['nodes'])
+
+    def save(self, path: str) -> None:
+        """ Save graph, data of nodes must be json-serializable """
+        save_arrays(path, 'graph_m', {'matrix': self.adjacency_matrix.matrix},
+                    {'nodes': [node.data for node in self.nodes]})
 
     def index_of(self, data: T) -> Optional[Node]:
         """ Get node by data """
+        if self._index is not None:
+            try:
+                return self._index.get(data)
+            except TypeError:
+                return None
         for node in self.nodes:
             if data == node.data:
                 return node
         return None
 
+    def subscribe(self, listener: Listener) -> None:
+        """ Call listener(first, second, old, new) after every changed weight """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        self._listeners.remove(listener)
+
+    def weight_bounds(self) -> Optional[Tuple[bool, int]]:
+        """ (all weights are non-negative integers, upper bound of weights) kept by setters, O(1)
+        None for matrix given from outside, it is not scanned; writes straight into the matrix are not seen
+        """
+        return self._bounds
+
+    def _track(self, weights: Union[float, np.ndarray]) -> None:
+        if self._bounds is None:
+            return
+        integral, max_weight = self._bounds
+        if np.ndim(weights) == 0:
+            weight = float(weights)
+            if integral and np.isfinite(weight) and weight >= 0 and weight.is_integer():
+                self._bounds = True, max(max_weight, int(weight))
+            else:
+                self._bounds = False, max_weight
+            return
+        added, added_max = integral_weights(weights)
+        self._bounds = integral and added, max(max_weight, added_max)
+
+    def _set_weight(self, first_node: int, second_node: int, weight: float) -> None:
+        self._track(weight)
+        old = self.adjacency_matrix[first_node][second_node]
+        self.adjacency_matrix[first_node][second_node] = weight
+        if old != weight:
+            for listener in list(self._listeners):
+                listener(first_node, second_node, float(old), float(weight))
+
     def set_connect_asymmetric(self, first_node: int, second_node: int, weight: int = 1) -> None:
         """ Connect nodes asymmetric a -> b != b <- a """
-        self.adjacency_matrix[first_node][second_node] = weight
+        self._set_weight(first_node, second_node, weight)
 
     def set_connect_symmetric(self, first_node: int, second_node, weight: int = 1) -> None:
         """ Connect nodes symmetric a -> b == b <- a """
-        self.adjacency_matrix[first_node][second_node] = self.adjacency_matrix[second_node][first_node] = weight
+        self._set_weight(first_node, second_node, weight)
+        self._set_weight(second_node, first_node, weight)
+
+    def connect_many(
+            self,
+            first_nodes: np.ndarray,
+            second_nodes: np.ndarray,
+            weights: Union[float, np.ndarray] = 1,
+            symmetric: bool = False,
+    ) -> None:
+        """ Connect pairs first[i] -> second[i] in one call, both ways if symmetric """
+        if self._listeners:  # listeners get every pair, slow path
+            setter = self.set_connect_symmetric if symmetric else self.set_connect_asymmetric
+            weights = np.broadcast_to(weights, np.shape(first_nodes))
+            for first_node, second_node, weight in zip(np.ravel(first_nodes).tolist(),
+                                                       np.ravel(second_nodes).tolist(), np.ravel(weights).tolist()):
+                setter(first_node, second_node, weight)
+            return
+        self._track(weights)
+        self.adjacency_matrix.matrix[first_nodes, second_nodes] = weights
+        if symmetric:
+            self.adjacency_matrix.matrix[second_nodes, first_nodes] = weights
+
+    def neighbours(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Indexes and weights of outgoing edges """
+        row = self.adjacency_matrix[node]
+        targets = np.flatnonzero(row)
+        return targets, row[targets]
+
+    def incoming(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Indexes and weights of incoming edges """
+        column = self.adjacency_matrix.matrix[:, node]
+        sources = np.flatnonzero(column)
+        return sources, column[sources]
 
     def connections_from(self, node: int) -> List[Tuple[Node, float]]:
         """ Get connections from node """
-        return [(self.nodes[col_num], self.adjacency_matrix[node][col_num])
-                for col_num in range(len(self.adjacency_matrix[node]))
-                if self.adjacency_matrix[node][col_num] != 0]
+        row = self.adjacency_matrix[node]
+        return [(self.nodes[col_num], row[col_num]) for col_num in np.flatnonzero(row)]
 
     def connections_to(self, node: int) -> List[Tuple[Node, float]]:
         """ Get connections to node """
-        column = [row[node] for row in self.adjacency_matrix]
-        return [(self.nodes[row_num], column[row_num]) for row_num in range(len(column)) if column[row_num] != 0]
+        column = self.adjacency_matrix.matrix[:, node]
+        return [(self.nodes[row_num], column[row_num]) for row_num in np.flatnonzero(column)]
 
     def has_path(self, first_node: int, second_node: int) -> bool:
         """ Path first -> second """
@@ -113,3 +302,124 @@ class GraphM:
     def get_weight(self, first_node: int, second_node: int) -> float:
         """ Weight from first -> second """
         return self.adjacency_matrix[first_node][second_node]
+
+
+@dataclass(eq=False)
+class GraphCSR:
+    """ Graph over compressed sparse rows: edges of node i are targets[offsets[i]:offsets[i + 1]] """
+    nodes: int
+    offsets: np.ndarray
+    targets: np.ndarray
+    weights: np.ndarray
+    _reverse: Optional[GraphCSR] = field(default=None, init=False, repr=False, compare=False)
+
+    def __len__(self) -> int:
+        return self.nodes
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GraphCSR):
+            return NotImplemented
+        return self.nodes == other.nodes and np.array_equal(self.offsets, other.offsets) and \
+            np.array_equal(self.targets, other.targets) and np.array_equal(self.weights, other.weights)
+
+    @property
+    def edges(self) -> Iterator[Tuple[int, int, float]]:
+        """ (u, v, w) triples, same as GraphL.edges """
+        return zip(*(column.tolist() for column in self.columns()))
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Sources, targets and weights of edges, same as GraphL.columns """
+        return np.repeat(np.arange(self.nodes), np.diff(self.offsets)), self.targets, self.weights
+
+    @staticmethod
+    def from_edges(nodes: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> GraphCSR:
+        """ Creates graph from edge columns """
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=nodes), out=offsets[1:])
+        return GraphCSR(
+            nodes,
+            offsets,
+            np.asarray(targets, dtype=np.int64)[order],
+            np.asarray(weights, dtype=np.float64)[order],
+        )
+
+    @staticmethod
+    def from_graph(graph: Graph) -> GraphCSR:
+        """ Converts GraphM or GraphL, GraphCSR is returned as is """
+        if isinstance(graph, GraphCSR):
+            return graph
+        if isinstance(graph, GraphM):
+            matrix = graph.adjacency_matrix.matrix
+            sources, targets = np.nonzero(matrix)
+            return GraphCSR.from_edges(len(graph), sources, targets, matrix[sources, targets])
+        if isinstance(graph, GraphL):
+            return GraphCSR.from_edges(len(graph), *graph.columns())
+        raise TypeError(f'unsupported graph type: {type(graph).__name__}')
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> GraphCSR:
+        """ Load graph written by save, arrays are memory-mapped read-only by default """
+        arrays, meta = load_arrays(path, 'graph_csr', mmap)
+        return GraphCSR(meta['nodes'], arrays['offsets'], arrays['targets'], arrays['weights'])
+
+    def save(self, path: str) -> None:
+        save_arrays(path, 'graph_csr', {'offsets': self.offsets, 'targets': self.targets, 'weights': self.weights},
+                    {'nodes': self.nodes})
+
+    def reverse(self) -> GraphCSR:
+        """ Graph of incoming edges, built once and cached """
+        if self._reverse is None:
+            sources, targets, weights = self.columns()
+            self._reverse = GraphCSR.from_edges(self.nodes, targets, sources, weights)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def neighbours(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Indexes and weights of outgoing edges """
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return self.targets[start:end], self.weights[start:end]
+
+    def incoming(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Indexes and weights of incoming edges """
+        return self.reverse().neighbours(node)
+
+    def frontier(self, nodes: np.ndarray) -> np.ndarray:
+        """ Targets of all edges going out of nodes, with repeats """
+        starts, counts = self.offsets[nodes], self.offsets[np.asarray(nodes) + 1] - self.offsets[nodes]
+        shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.targets[shift + np.arange(counts.sum())]
+
+    def undirected(self) -> GraphCSR:
+        """ Graph with every edge in both directions """
+        sources, targets, weights = self.columns()
+        return GraphCSR.from_edges(self.nodes, np.concatenate([sources, targets]),
+                                   np.concatenate([targets, sources]), np.concatenate([weights, weights]))
+
+    def has_path(self, first_node: int, second_node: int) -> bool:
+        """ Path first -> second """
+        return bool(np.any(self.neighbours(first_node)[0] == second_node))
+
+    def get_weight(self, first_node: int, second_node: int) -> float:
+        """ Weight from first -> second, 0 if there is no edge """
+        targets, weights = self.neighbours(first_node)
+        found = np.flatnonzero(targets == second_node)
+        return weights[found[0]] if len(found) else 0
+
+
+Graph = Union[GraphL, GraphM, GraphCSR]
+
+
+def as_adjacency(graph: Graph) -> Union[GraphM, GraphCSR]:
+    """ Graph with neighbours(), GraphL is converted to GraphCSR """
+    return GraphCSR.from_graph(graph) if isinstance(graph, GraphL) else graph
+
+
+def test():
+    graph = GraphM([Node('a', 5), Node('b', 7)])  # index of node is not its position
+    assert graph.index_of('b') is graph.nodes[1] and graph.index_of('c') is None
+    unhashable = GraphM([Node(['a'], 5), Node(['b'], 7)])  # scan
+    assert unhashable.index_of(['b']) is unhashable.nodes[1]
+    shuffled = GraphM([Node('x', 2), Node('y', 0), Node('z', 1)])
+    assert [shuffled.index_of(data).index for data in 'xyz'] == [2, 0, 1]
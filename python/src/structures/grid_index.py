@@ -0,0 +1,181 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.structures.graph import GraphCSR
+
+BUCKET_SIZE = 4  # average points in one cell
+TILE = 4  # queries are processed together by tiles of TILE x TILE cells
+BATCH = 256  # at most so many queries of one tile at once, clustered points may fill a single cell
+BLOCK = 4096  # at most so many candidate points per distance block
+
+
+class GridIndex:
+    """ Uniform grid over (x, y) points, cells are kept as compressed rows: points of cell c are
+    order[offsets[c]:offsets[c + 1]], cell c = column * rows + row, so one column of cells is one slice
+    queries are processed by tiles of cells in batches of BATCH against blocks of BLOCK candidates,
+    so memory is O(n + queries * k) instead of n^2 of weight_matrix even when all points fall in a few cells
+    """
+
+    def __init__(self, points: np.ndarray, bucket: int = BUCKET_SIZE):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        size = len(self.points)
+        if size == 0:
+            raise ValueError('index needs at least one point')
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+        cell = max(np.sqrt(extent[0] * extent[1] * bucket / size), extent.max() * bucket / size)
+        self.cell = float(cell) if cell > 0 else 1.
+        self.shape = (np.floor(extent / self.cell).astype(np.int64) + 1).tolist()
+        cells = self._cells(self.points)
+        self.order = np.argsort(cells, kind='stable')
+        self.offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.shape[0] * self.shape[1]), out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _coordinates(self, points: np.ndarray) -> np.ndarray:
+        """ (column, row) of cells, points outside of grid go to the closest border cell """
+        coordinates = np.floor((points - self.origin) / self.cell).astype(np.int64)
+        return np.clip(coordinates, 0, np.array(self.shape) - 1)
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        coordinates = self._coordinates(points)
+        return coordinates[:, 0] * self.shape[1] + coordinates[:, 1]
+
+    def _block(self, columns: Tuple[int, int], rows: Tuple[int, int]) -> np.ndarray:
+        """ Indexes of points in cells columns[0]..columns[1] x rows[0]..rows[1], bounds are clipped """
+        first_row, last_row = max(rows[0], 0), min(rows[1], self.shape[1] - 1)
+        slices = []
+        for column in range(max(columns[0], 0), min(columns[1], self.shape[0] - 1) + 1):
+            start = self.offsets[column * self.shape[1] + first_row]
+            end = self.offsets[column * self.shape[1] + last_row + 1]
+            slices.append(self.order[start:end])
+        return np.concatenate(slices)
+
+    def _covered(self, queries: np.ndarray, columns: Tuple[int, int], rows: Tuple[int, int]) -> np.ndarray:
+        """ Radius around every query that lies inside the block, inf on sides where grid ends """
+        covered = np.full(len(queries), np.inf)
+        for axis, (first, last) in enumerate((columns, rows)):
+            if first > 0:
+                covered = np.minimum(covered, queries[:, axis] - (self.origin[axis] + first * self.cell))
+            if last < self.shape[axis] - 1:
+                covered = np.minimum(covered, self.origin[axis] + (last + 1) * self.cell - queries[:, axis])
+        return covered
+
+    def _groups(self, queries: np.ndarray) -> List[np.ndarray]:
+        """ Indexes of queries grouped by their tile, big groups are split into batches of BATCH """
+        coordinates = self._coordinates(queries) // TILE
+        tiles = coordinates[:, 0] * (self.shape[1] // TILE + 1) + coordinates[:, 1]
+        order = np.argsort(tiles, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(tiles[order])) + 1)
+        return [group[start:start + BATCH] for group in groups for start in range(0, len(group), BATCH)]
+
+    @staticmethod
+    def _distances(queries: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """ Same arithmetic as Matrix.weight_matrix, so distances match it exactly """
+        distances = np.subtract.outer(queries[:, 0], points[:, 0])
+        distances *= distances
+        dy = np.subtract.outer(queries[:, 1], points[:, 1])
+        dy *= dy
+        distances += dy
+        return np.sqrt(distances, out=distances)
+
+    def _nearest(
+            self, group: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int, own: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ k nearest candidates of every query sorted by distance, candidates are merged block by block
+        @param group: indexes of queries, with own the query skips the point with the same index
+        @return: (queries, k) distances and indexes of points
+        """
+        distances = np.full((len(queries), k), np.inf)
+        indexes = np.full((len(queries), k), -1, dtype=np.int64)
+        for start in range(0, len(candidates), BLOCK):
+            part = candidates[start:start + BLOCK]
+            block = self._distances(queries, self.points[part])
+            if own:
+                block[group[:, None] == part[None, :]] = np.inf
+            block = np.concatenate([distances, block], axis=1)
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+            distances = np.take_along_axis(block, nearest, axis=1)
+            indexes = np.concatenate([indexes, np.broadcast_to(part, (len(queries), len(part)))], axis=1)
+            indexes = np.take_along_axis(indexes, nearest, axis=1)
+        sort = np.argsort(distances, axis=1, kind='stable')
+        return np.take_along_axis(distances, sort, axis=1), np.take_along_axis(indexes, sort, axis=1)
+
+    def _queries(self, points: Optional[np.ndarray]) -> Tuple[np.ndarray, bool]:
+        if points is None:
+            return self.points, True
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2), False
+
+    def query(self, k: int, points: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ k nearest indexed points of every query sorted by distance, rings of cells grow until k-th is inside
+        @param points: (m, 2) queries, if None indexed points themselves are queried and each skips itself
+        @return: (m, k) distances and (m, k) indexes, k is cut to number of available points
+        """
+        queries, own = self._queries(points)
+        k = min(k, len(self) - own)
+        distances = np.empty((len(queries), k), dtype=np.float64)
+        indexes = np.empty((len(queries), k), dtype=np.int64)
+        if k <= 0:
+            return distances, indexes
+
+        coordinates = self._coordinates(queries) // TILE * TILE
+        for group in self._groups(queries):
+            column, row = coordinates[group[0]].tolist()
+            ring = 1
+            while len(group):
+                columns, rows = (column - ring, column + TILE - 1 + ring), (row - ring, row + TILE - 1 + ring)
+                candidates = self._block(columns, rows)
+                covered = self._covered(queries[group], columns, rows)
+                if len(candidates) - own < k:  # whole grid always has enough
+                    ring += 1
+                    continue
+                nearest_distances, nearest = self._nearest(group, queries[group], candidates, k, own)
+                done = nearest_distances[:, -1] <= covered
+                distances[group[done]] = nearest_distances[done]
+                indexes[group[done]] = nearest[done]
+                group = group[~done]
+                ring += 1
+        return distances, indexes
+
+    def query_radius(self, radius: float, points: Optional[np.ndarray] = None) -> GraphCSR:
+        """ Indexed points not farther than radius from every query
+        @param points: (m, 2) queries, if None indexed points themselves are queried and each skips itself
+        @return: row i holds points of query i sorted by distance, weights are distances
+        """
+        queries, own = self._queries(points)
+        sources, targets, weights = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+        for group in self._groups(queries):
+            low = self._coordinates(queries[group] - radius).min(axis=0).tolist()
+            high = self._coordinates(queries[group] + radius).max(axis=0).tolist()
+            candidates = self._block((low[0], high[0]), (low[1], high[1]))
+            for start in range(0, len(candidates), BLOCK):
+                part = candidates[start:start + BLOCK]
+                block = self._distances(queries[group], self.points[part])
+                inside = block <= radius
+                if own:
+                    inside &= group[:, None] != part[None, :]
+                found, where = np.nonzero(inside)
+                sources.append(group[found])
+                targets.append(part[where])
+                weights.append(block[found, where])
+
+        sources, targets, weights = np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+        order = np.lexsort((targets, weights, sources))
+        return GraphCSR.from_edges(len(queries), sources[order], targets[order], weights[order])
+
+    def knn_graph(self, k: int, symmetric: bool = True) -> GraphCSR:
+        """ Every point connected to its k nearest points, weight is distance
+        @param symmetric: also add reversed edges (once), so the graph can be used as undirected
+        """
+        distances, indexes = self.query(k)
+        sources = np.repeat(np.arange(len(self)), indexes.shape[1])
+        targets, weights = indexes.ravel(), distances.ravel()
+        if symmetric:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            weights = np.concatenate([weights, weights])
+            _, unique = np.unique(sources * len(self) + targets, return_index=True)
+            sources, targets, weights = sources[unique], targets[unique], weights[unique]
+        return GraphCSR.from_edges(len(self), sources, targets, weights)
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from heapq import heappush, heappop
-from typing import List, TypeVar, Optional
+from typing import List, TypeVar, Tuple
 
 T = TypeVar('T')
 
@@ -27,89 +27,109 @@ class Heap:
 
 
 @dataclass
-class MyHeap:
-    nodes: List[T] = field(default_factory=list)
+class IndexedHeap:
+    """ d-ary min heap over ids 0..capacity-1, keys and ids are parallel lists, positions maps id -> slot """
+    capacity: int
+    arity: int = 4
+    keys: List[float] = field(default_factory=list, init=False, repr=False)
+    ids: List[int] = field(default_factory=list, init=False, repr=False)
+    positions: List[int] = field(default_factory=list, init=False, repr=False)
 
-    def __init__(self, nodes: List[T]) -> None:
-        self.nodes.append(nodes)
-        self.min_heapify()
-
-    def __getitem__(self, index: int) -> T:
-        return self.nodes[index]
+    def __post_init__(self):
+        self.positions = [-1] * self.capacity
 
     def __len__(self) -> int:
-        return len(self.nodes)
-
-    @staticmethod
-    def __parent_index(i: int) -> int:
-        return (i - 1) // 2
-
-    @staticmethod
-    def __left_index(i: int) -> int:
-        return 2 * i + 1
-
-    @staticmethod
-    def __right_index(i: int) -> int:
-        return 2 * i + 2
+        return len(self.ids)
 
-    def root(self) -> T:
-        return self.nodes[0]
+    def __contains__(self, item: int) -> bool:
+        return self.positions[item] != -1
 
-    def parent(self, i: int) -> Optional[T]:
-        if 0 < i < len(self):
-            return self[(i - 1) // 2]
-        return None
+    def contains(self, item: int) -> bool:
+        return self.positions[item] != -1
 
-    def left(self, i: int) -> Optional[T]:
-        if 0 <= i < len(self) and 2 * i + 1 < len(self):
-            return self[2 * i + 1]
-        return None
-
-    def right(self, i: int) -> Optional[T]:
-        if 0 <= i < len(self) and 2 * i + 2 < len(self):
-            return self[2 * i + 2]
-        return None
-
-    def min(self) -> T:
-        return self.nodes[0]
-
-    def min_heapify_subtree(self, i: int) -> None:
-        """ Heapify at a node assuming all subtrees are heapified """
-        size = len(self)
-        left = self.__left_index(i)
-        right = self.__right_index(i)
-        minimum = i
-        if left < size and self.nodes[left] < self.nodes[minimum]:
-            minimum = left
-        if right < size and self.nodes[right] < self.nodes[minimum]:
-            minimum = right
-        if minimum != i:
-            self.nodes[i], self.nodes[minimum] = self.nodes[minimum], self.nodes[i]
-            self.min_heapify_subtree(minimum)
-
-    def pop(self) -> Optional[T]:
-        """ just pop =) """
-        minimum = self.nodes[0]
-        if len(self) > 1:
-            self.nodes[0] = self.nodes[-1]
-            self.nodes.pop()
-            self.min_heapify_subtree(0)
-        elif len(self) == 1:
-            self.nodes.pop()
+    def empty(self) -> bool:
+        return len(self.ids) == 0
+
+    def key(self, item: int) -> float:
+        return self.keys[self.positions[item]]
+
+    def min(self) -> Tuple[int, float]:
+        return self.ids[0], self.keys[0]
+
+    def push(self, item: int, key: float) -> None:
+        """ Insert new id, use update() if it may be already inside """
+        if self.positions[item] != -1:
+            raise ValueError(f'{item} is already in heap')
+        self.keys.append(key)
+        self.ids.append(item)
+        self.positions[item] = len(self.ids) - 1
+        self._sift_up(len(self.ids) - 1)
+
+    def pop(self) -> Tuple[int, float]:
+        """ Remove and return (id, key) with minimum key """
+        if not self.ids:
+            raise IndexError('pop from empty heap')
+        item, key = self.ids[0], self.keys[0]
+        last_item, last_key = self.ids.pop(), self.keys.pop()
+        self.positions[item] = -1
+        if self.ids:
+            self.ids[0], self.keys[0] = last_item, last_key
+            self.positions[last_item] = 0
+            self._sift_down(0)
+        return item, key
+
+    def decrease_key(self, item: int, key: float) -> None:
+        """ Lower key of id inside heap, bubble it up """
+        index = self.positions[item]
+        if index == -1:
+            raise KeyError(item)
+        if key > self.keys[index]:
+            raise ValueError(f'new key {key} is greater than current {self.keys[index]}')
+        self.keys[index] = key
+        self._sift_up(index)
+
+    def update(self, item: int, key: float) -> None:
+        """ Insert id or change its key in any direction """
+        index = self.positions[item]
+        if index == -1:
+            self.push(item, key)
+        elif key < self.keys[index]:
+            self.keys[index] = key
+            self._sift_up(index)
         else:
-            return None
-        return minimum
-
-    def decrease_key(self, i: int, val: T) -> None:
-        """ Update node value, bubble it up as necessary to maintain heap property """
-        self.nodes[i] = val
-        parent = self.parent(i)
-        while i != 0 and self.nodes[parent] > self.nodes[i]:
-            self.nodes[parent], self.nodes[i] = self.nodes[i], self.nodes[parent]
-            i = parent
-            parent = self.parent(i) if i > 0 else None
-
-    def min_heapify(self) -> None:
-        """ Heapify an un-heapified array """
-        for i in range(len(self.nodes), -1, -1):
-            self.min_heapify_subtree(i)
+            self.keys[index] = key
+            self._sift_down(index)
+
+    def _sift_up(self, index: int) -> None:
+        keys, ids, positions, arity = self.keys, self.ids, self.positions, self.arity
+        item, key = ids[index], keys[index]
+        while index > 0:
+            parent = (index - 1) // arity
+            if keys[parent] <= key:
+                break
+            keys[index], ids[index] = keys[parent], ids[parent]
+            positions[ids[index]] = index
+            index = parent
+        keys[index], ids[index] = key, item
+        positions[item] = index
+
+    def _sift_down(self, index: int) -> None:
+        keys, ids, positions, arity = self.keys, self.ids, self.positions, self.arity
+        size = len(ids)
+        item, key = ids[index], keys[index]
+        while True:
+            first = arity * index + 1
+            if first >= size:
+                break
+            last = min(first + arity, size)
+            child = first
+            for other in range(first + 1, last):
+                if keys[other] < keys[child]:
+                    child = other
+            if keys[child] >= key:
+                break
+            keys[index], ids[index] = keys[child], ids[child]
+            positions[ids[index]] = index
+            index = child
+        keys[index], ids[index] = key, item
+        positions[item] = index
@@ -1,46 +1,116 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from math import sqrt
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
 
+import numpy as np
 
-@dataclass
+from src.structures.storage import load_arrays, save_arrays
+
+BLOCK_SIZE = 2048
+
+
+@dataclass(eq=False)
 class Matrix:
+    """ Square matrix over contiguous ndarray (or memory-mapped file), rows are accessible as matrix[i][j] """
     dimension: int
-    matrix: List[List[float]] = field(default_factory=list)
+    matrix: Optional[np.ndarray] = None
+    dtype: type = np.float64
 
     def __post_init__(self):
-        for idx in range(self.dimension):
-            self.matrix.append([0] * self.dimension)
+        if self.matrix is None:
+            self.matrix = np.zeros((self.dimension, self.dimension), dtype=self.dtype)
+        elif not isinstance(self.matrix, np.memmap):
+            self.matrix = np.ascontiguousarray(self.matrix, dtype=self.dtype)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.dimension == other.dimension and np.array_equal(self.matrix, other.matrix)
+
+    @staticmethod
+    def from_array(array: np.ndarray) -> Matrix:
+        """ Wrap existing square array without copying """
+        return Matrix(len(array), array, array.dtype.type)
+
+    @staticmethod
+    def open(path: str, writable: bool = False) -> Matrix:
+        """ Map matrix, created with path=..., back without reading or recomputing it """
+        return Matrix.from_array(np.load(path, mmap_mode='r+' if writable else 'r'))
 
     @staticmethod
-    def weight_matrix(points: List[Tuple[float, float]]) -> Matrix:
-        """ adjacency_matrix """
-        weight_matrix = Matrix(len(points))
-        for idx in range(0, weight_matrix.dimension):
-            for idy in range(idx + 1, weight_matrix.dimension):
-                distance = sqrt((points[idy][0] - points[idx][0]) ** 2 + (points[idy][1] - points[idx][1]) ** 2)
-                weight_matrix.matrix[idx][idy] = weight_matrix.matrix[idy][idx] = distance
-        return weight_matrix
+    def load(path: str, mmap: bool = True) -> Matrix:
+        """ Load matrix written by save, memory-mapped read-only by default """
+        arrays, _ = load_arrays(path, 'matrix', mmap)
+        return Matrix.from_array(arrays['matrix'])
+
+    def save(self, path: str) -> None:
+        save_arrays(path, 'matrix', {'matrix': self.matrix})
+
+    @staticmethod
+    def _allocate(dimension: int, dtype: type, path: Optional[str]) -> np.ndarray:
+        if path is None:
+            return np.empty((dimension, dimension), dtype=dtype)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(dimension, dimension))
+
+    @staticmethod
+    def _blocks(dimension: int, block: int) -> Iterator[slice]:
+        for start in range(0, dimension, block):
+            yield slice(start, min(start + block, dimension))
+
+    @staticmethod
+    def weight_matrix(
+            points: List[Tuple[float, float]],
+            dtype: type = np.float64,
+            path: Optional[str] = None,
+            block: int = BLOCK_SIZE,
+    ) -> Matrix:
+        """ adjacency_matrix
+        @param points: (x, y) coordinates
+        @param dtype: float64, float32 or float16 for the stored distances
+        @param path: .npy file to write tiles into instead of RAM, reopen it later with Matrix.open
+        @param block: tile size, tile is computed in float64 and then stored
+        """
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = coords[:, 0], coords[:, 1]
+        weight_matrix = Matrix._allocate(len(coords), dtype, path)
+        for rows in Matrix._blocks(len(coords), block):
+            for cols in Matrix._blocks(len(coords), block):
+                distances = np.subtract.outer(x[rows], x[cols])
+                distances *= distances
+                dy = np.subtract.outer(y[rows], y[cols])
+                dy *= dy
+                distances += dy
+                np.sqrt(distances, out=distances)
+                weight_matrix[rows, cols] = distances
+        if path is not None:
+            weight_matrix.flush()
+        return Matrix.from_array(weight_matrix)
 
     @staticmethod
-    def savings_matrix(weight_matrix: Matrix, point: int) -> Matrix:
-        """ for clarke-wright algorithm """
-        savings_matrix = Matrix(len(weight_matrix))
-        for idx in range(0, savings_matrix.dimension):
-            for idy in range(idx + 1, savings_matrix.dimension):
-                savings = weight_matrix[point][idx] + weight_matrix[point][idy] - weight_matrix[idx][idy]
-                savings_matrix.matrix[idx][idy] = savings_matrix.matrix[idy][idx] = savings
-        return savings_matrix
+    def savings_matrix(
+            weight_matrix: Matrix,
+            point: int,
+            dtype: Optional[type] = None,
+            path: Optional[str] = None,
+            block: int = BLOCK_SIZE,
+    ) -> Matrix:
+        """ for clarke-wright algorithm, same tiling options as weight_matrix """
+        dimension = len(weight_matrix)
+        row = np.asarray(weight_matrix[point], dtype=np.float64)
+        savings_matrix = Matrix._allocate(dimension, dtype or weight_matrix.matrix.dtype, path)
+        for rows in Matrix._blocks(dimension, block):
+            for cols in Matrix._blocks(dimension, block):
+                savings = np.add.outer(row[rows], row[cols])
+                savings -= weight_matrix.matrix[rows, cols]
+                savings_matrix[rows, cols] = savings
+        np.fill_diagonal(savings_matrix, 0)
+        if path is not None:
+            savings_matrix.flush()
+        return Matrix.from_array(savings_matrix)
 
     def __str__(self):
-        string = ''
-        for s in self.matrix:
-            for elem in s:
-                string += f'{elem:0.2f}\t'
-            string += '\n'
-        return string
+        return ''.join(''.join(f'{elem:0.2f}\t' for elem in row) + '\n' for row in self.matrix)
 
     def __len__(self) -> int:
         return self.dimension
@@ -48,5 +118,8 @@ class Matrix:
     def __repr__(self):
         return str(self)
 
-    def __getitem__(self, index: int) -> List[float]:
+    def __getitem__(self, index: int) -> np.ndarray:
         return self.matrix[index]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.matrix)
@@ -0,0 +1,60 @@
+import struct
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import orjson
+
+MAGIC = b'PGSTRUCT'
+VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct('<8sHI')
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_arrays(path: str, kind: str, arrays: Dict[str, np.ndarray], meta: Any = None) -> None:
+    """ Write arrays with kind of structure and json-serializable meta
+    layout: magic, version, header length, orjson header, arrays aligned to ALIGN bytes
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    descriptions, offset = [], 0
+    for name, array in arrays.items():
+        descriptions.append({'name': name, 'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset})
+        offset = _aligned(offset + array.nbytes)
+    header = orjson.dumps({'kind': kind, 'meta': meta, 'arrays': descriptions})
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    with open(path, 'wb') as file:
+        file.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        file.write(header)
+        for description, array in zip(descriptions, arrays.values()):
+            file.seek(data_start + description['offset'])
+            array.tofile(file)
+        file.truncate(data_start + offset)
+
+
+def load_arrays(path: str, kind: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Any]:
+    """ Read arrays, memory-mapped read-only if mmap, otherwise copied into RAM """
+    with open(path, 'rb') as file:
+        magic, version, header_size = _PREFIX.unpack(file.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a structure file')
+        if version != VERSION:
+            raise ValueError(f'{path} has unsupported version {version}')
+        header = orjson.loads(file.read(header_size))
+    if header['kind'] != kind:
+        raise ValueError(f'{path} contains {header["kind"]}, not {kind}')
+
+    data_start = _aligned(_PREFIX.size + header_size)
+    arrays = {}
+    for description in header['arrays']:
+        dtype, shape = np.dtype(description['dtype']), tuple(description['shape'])
+        if not mmap or 0 in shape:
+            array = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)),
+                                offset=data_start + description['offset']).reshape(shape)
+        else:
+            array = np.memmap(path, dtype=dtype, mode='r', offset=data_start + description['offset'], shape=shape)
+        arrays[description['name']] = array
+    return arrays, header['meta']